@@ -0,0 +1,63 @@
+"""
+Compare `Dataset.dissolve` against grouping Records in Python and running one
+`unary_union` per group, on a grid of jittered parcels which share their edges.
+
+Run with `python -m benchmarks.dissolve [workers]`.
+"""
+import random
+import sys
+import time
+
+from shapely.geometry import Polygon
+from shapely.ops import unary_union
+
+from meridian import Dataset, Record
+
+
+class Parcel(Record):
+    block: int
+
+
+def parcels(size, block_size):
+    random.seed(0)
+    corners = {
+        (x, y): (x + random.uniform(-0.3, 0.3), y + random.uniform(-0.3, 0.3))
+        for x in range(size + 1)
+        for y in range(size + 1)
+    }
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    random.shuffle(cells)
+    for x, y in cells:
+        ring = [corners[x, y], corners[x + 1, y], corners[x + 1, y + 1], corners[x, y + 1]]
+        blocks_per_row = size // block_size
+        yield Parcel(Polygon(ring), block=(x // block_size) * blocks_per_row + y // block_size)
+
+
+def group_and_union(dataset):
+    groups = {}
+    for record in dataset:
+        groups.setdefault(record.block, []).append(record.geom)
+    return {block: unary_union(geoms) for block, geoms in groups.items()}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    for size, block_size in [(200, 10), (200, 100)]:
+        dataset = Dataset(parcels(size, block_size))
+        groups = (size // block_size) ** 2
+        print(f"{len(dataset)} parcels in {groups} blocks")
+        print(f"  {'groupby + unary_union':<24} {timed(lambda: group_and_union(dataset)):.2f}s")
+        print(f"  {'dissolve':<24} {timed(lambda: dataset.dissolve('block')):.2f}s")
+        if workers:
+            elapsed = timed(lambda: dataset.dissolve("block", workers=workers))
+            print(f"  {f'dissolve, {workers} workers':<24} {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Compare the records per second of exporting a Dataset with the per-record
+path (`json.dumps(record.geojson)` / `geom.wkb` in a loop) against the bulk
+`Dataset.iter_geojson` and `Dataset.to_wkb_array` methods.
+
+Run with `python -m benchmarks.export`.
+"""
+import json
+import time
+
+from examples.data import power_plants_data, states_data
+from examples.spatial_join import PowerPlant, State
+
+
+def rate(dataset, fn, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(dataset)
+    return len(dataset) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    cases = {
+        "geojson, per record": lambda ds: [json.dumps(r.geojson) for r in ds],
+        "geojson, iter_geojson": lambda ds: list(ds.iter_geojson()),
+        "wkb, per record": lambda ds: [r.geom.wkb for r in ds],
+        "wkb, to_wkb_array": lambda ds: ds.to_wkb_array(),
+    }
+
+    for name, model, path in [
+        ("power plants (points)", PowerPlant, power_plants_data),
+        ("states (polygons)", State, states_data),
+    ]:
+        dataset = model.load_from(path)
+        print(f"{name}: {len(dataset)} records")
+        for case, fn in cases.items():
+            print(f"  {case:<24} {rate(dataset, fn):>10,.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
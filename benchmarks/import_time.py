@@ -0,0 +1,62 @@
+"""
+Track how long `import meridian` takes, and which dependencies it pulls in,
+then compare reading GeoJSON with the built-in reader against fiona.
+
+Run with `python -m benchmarks.import_time`.
+"""
+import subprocess
+import sys
+import time
+
+from examples.data import power_plants_data, states_data
+from examples.spatial_join import PowerPlant, State
+
+_HEAVY = ("fiona", "pyarrow", "shapely", "rtree", "numpy")
+
+_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import meridian
+elapsed = time.perf_counter() - start
+print(elapsed, *(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def import_time(repeat=5):
+    """Best of `repeat` fresh interpreters, and the heavy modules imported."""
+    best, modules = None, ()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _SCRIPT.format(heavy=_HEAVY)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        elapsed = float(output[0])
+        if best is None or elapsed < best:
+            best, modules = elapsed, output[1:]
+    return best, modules
+
+
+def read_rate(model, path, **kwargs):
+    start = time.perf_counter()
+    dataset = model.load_from(path, **kwargs)
+    return len(dataset) / (time.perf_counter() - start)
+
+
+def main():
+    elapsed, modules = import_time()
+    print(f"import meridian: {elapsed * 1000:.0f}ms, imports {', '.join(modules)}")
+
+    for name, model, path in [
+        ("power plants", PowerPlant, power_plants_data),
+        ("states", State, states_data),
+    ]:
+        native = read_rate(model, path)
+        # passing any kwarg to load_from makes it go through fiona.
+        fiona = read_rate(model, path, mode="r")
+        print(f"{name:<14} built-in {native:>8,.0f} records/s  fiona {fiona:>8,.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
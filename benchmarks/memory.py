@@ -0,0 +1,69 @@
+"""
+Compare the memory taken by a Dataset of lines and polygons stored as shapely
+geometries against the same Dataset quantized to 1 cm (`precision=0.01`).
+
+Each case is built in a fresh interpreter, and its resident memory is measured
+before and after the Dataset is built (Linux only, through /proc).
+
+Run with `python -m benchmarks.memory`.
+"""
+import subprocess
+import sys
+
+CASE = """
+import random
+
+from shapely.geometry import LineString, Point
+
+from meridian import Dataset, Record
+
+
+class Feature(Record):
+    id: int
+
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def features(kind, n=20000):
+    random.seed(0)
+    for i in range(1, n + 1):
+        x, y = random.uniform(0, 1e6), random.uniform(0, 1e6)
+        if kind == "polygons":
+            geom = Point(x, y).buffer(random.uniform(10, 500), 64)
+        else:
+            geom = LineString(
+                (x + j * 10 + random.random(), y + random.uniform(-50, 50))
+                for j in range(256)
+            )
+        yield Feature(geom, id=i)
+
+
+before = rss()
+dataset = Dataset(features({kind!r}), precision={precision!r})
+print(rss() - before)
+"""
+
+
+def measure(kind, precision):
+    code = CASE.format(kind=kind, precision=precision)
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return int(output)
+
+
+def main():
+    for kind in ("polygons", "lines"):
+        plain = measure(kind, None)
+        compact = measure(kind, 0.01)
+        print(
+            f"{kind}: {plain / 2 ** 20:.1f} MiB as shapely, "
+            f"{compact / 2 ** 20:.1f} MiB quantized ({plain / compact:.1f}x smaller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare query latency and join throughput for different Dataset layouts:
+
+ - the old fixed index properties (1000-entry leaves) with records in input order
+ - automatically chosen index properties with records in input order
+ - automatically chosen index properties with records in Hilbert curve order
+
+Run with `python -m benchmarks.query_latency`.
+"""
+import random
+import time
+
+import rtree
+
+from shapely.geometry import Point, box
+
+import meridian
+
+
+class Square(meridian.Record):
+    id: int
+
+
+class Location(meridian.Record):
+    id: int
+
+
+def legacy_properties():
+    properties = rtree.index.Property()
+    properties.dimension = 2
+    properties.fill_factor = 0.999
+    properties.leaf_capacity = 1000
+    return properties
+
+
+def make_squares(n, extent=1000.0, size=5.0):
+    for i in range(n):
+        x, y = random.uniform(0, extent), random.uniform(0, extent)
+        yield Square(box(x, y, x + random.uniform(0, size), y + random.uniform(0, size)), id=i)
+
+
+def make_points(n, extent=1000.0):
+    for i in range(n):
+        yield Location(Point(random.uniform(0, extent), random.uniform(0, extent)), id=i)
+
+
+def time_queries(dataset, queries):
+    start = time.perf_counter()
+    for query in queries:
+        dataset.intersection(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def time_join(d1, d2):
+    start = time.perf_counter()
+    count = sum(1 for _ in meridian.product(d1, d2))
+    return time.perf_counter() - start, count
+
+
+def main(n_squares=200_000, n_points=50_000, n_queries=20_000):
+    random.seed(42)
+    squares = list(make_squares(n_squares))
+    points = list(make_points(n_points))
+    queries = [box(x, y, x + 3, y + 3) for x, y in (p.geom.coords[0] for p in points)]
+    queries = queries[:n_queries]
+
+    layouts = {
+        "legacy, input order": dict(properties=legacy_properties()),
+        "tuned, input order": dict(),
+        "tuned, hilbert order": dict(order="hilbert"),
+    }
+
+    print(f"{n_squares} squares, {n_points} points, {len(queries)} queries")
+    for name, kwargs in layouts.items():
+        start = time.perf_counter()
+        d2 = meridian.Dataset(squares, **kwargs)
+        build = time.perf_counter() - start
+
+        latency = time_queries(d2, queries)
+
+        d1 = meridian.Dataset(points, order=kwargs.get("order"))
+        join, count = time_join(d1, d2)
+
+        print(
+            f"{name:<22} build {build:6.2f}s  query {latency:6.1f}us  "
+            f"join {join:6.2f}s ({count} pairs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
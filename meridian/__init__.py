@@ -17,8 +17,26 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+from meridian.cache import QueryCache
 from meridian.dataset import Dataset
 from meridian.record import Record
-from meridian.product import Product, intersection, product
+from meridian.product import (
+    Product,
+    SelfJoin,
+    intersection,
+    knn_join,
+    product,
+    self_join,
+)
 
-__all__ = ["Dataset", "Record", "Product", "intersection", "product"]
+__all__ = [
+    "Dataset",
+    "QueryCache",
+    "Record",
+    "Product",
+    "SelfJoin",
+    "intersection",
+    "knn_join",
+    "product",
+    "self_join",
+]
@@ -0,0 +1,125 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import threading
+import time
+
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_missing = object()
+
+#: A cached value, with the time it expires at, if any.
+_Entry = Tuple[Optional[float], Any]
+
+
+class QueryCache:
+    """
+    A size-bounded cache for Dataset query results.
+
+    Entries are evicted least-recently-used first once `maxsize` is reached, and
+    optionally expire `ttl` seconds after they were stored. If a `tolerance` is
+    given, query bounds are snapped to a grid of that size before lookup, so
+    queries which differ by less than the tolerance share a single entry and
+    get back the results of whichever of them was run first.
+
+    Since Datasets are immutable, cached results never need to be invalidated.
+    Keys include a token identifying the Dataset, so a single cache is safe to
+    share between Datasets as well as between threads.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: Optional[float] = None, tolerance: float = None
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        if tolerance is not None and tolerance <= 0:
+            raise ValueError("tolerance must be positive")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self._entries: "collections.OrderedDict[Hashable, _Entry]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self, owner: Hashable, name: str, bounds: Tuple[float, ...], *args: Any
+    ) -> Hashable:
+        """
+        Build the cache key for a query.
+
+        Args:
+            owner: a token identifying the Dataset being queried
+            name: the name of the query method
+            bounds: the (xmin, ymin, xmax, ymax) bounds of the query
+            args: any other arguments which affect the result
+
+        Returns:
+            a hashable key
+        """
+        if self.tolerance is not None:
+            bounds = tuple(round(b / self.tolerance) for b in bounds)
+        else:
+            bounds = tuple(bounds)
+        return owner, name, bounds, args
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Get the cached result for `key`, calling `compute` to produce
+        and store it if it's missing or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires, value = self._entries.get(key, (None, _missing))
+            if value is not _missing and (expires is None or expires > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute()
+        expires = now + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def info(self) -> CacheInfo:
+        """Hit and miss statistics, like `functools.lru_cache`."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
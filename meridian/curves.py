@@ -0,0 +1,103 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from typing import Callable, Dict, Iterable, List, Tuple
+
+Bounds = Tuple[float, float, float, float]
+
+#: Number of bits per axis of the grid that curve positions are computed on.
+ORDER = 16
+
+
+def hilbert_index(x: int, y: int, order: int = ORDER) -> int:
+    """
+    Position of the cell (x, y) along a Hilbert curve filling a
+    2**order by 2**order grid.
+    """
+    n = 1 << order
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def _spread_bits(v: int) -> int:
+    """Spread the low 16 bits of v out so there is a zero bit between each."""
+    v &= 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def zorder_index(x: int, y: int, order: int = ORDER) -> int:
+    """
+    Position of the cell (x, y) along a Z-order (Morton) curve, made by
+    interleaving the bits of x and y. Supports grids of up to 2**16 cells per side.
+    """
+    return _spread_bits(x) | (_spread_bits(y) << 1)
+
+
+_curves: Dict[str, Callable[[int, int, int], int]] = {
+    "hilbert": hilbert_index,
+    "zorder": zorder_index,
+}
+
+
+def curve_keys(bounds: Iterable[Bounds], curve: str = "hilbert") -> List[int]:
+    """
+    Compute the position of the centre of each bounding box along a
+    space filling curve laid over the extent of all of them. Sorting by
+    these keys puts objects which are close in space close together.
+
+    Args:
+        bounds: an iterable of (xmin, ymin, xmax, ymax)
+        curve: "hilbert" or "zorder"
+
+    Returns:
+        list of int, one per bounding box
+    """
+    if curve not in _curves:
+        raise ValueError(f"Curve must be one of {','.join(_curves)}")
+    index = _curves[curve]
+
+    centres = [((b[0] + b[2]) / 2, (b[1] + b[3]) / 2) for b in bounds]
+    if not centres:
+        return []
+
+    xs, ys = zip(*centres)
+    xmin, ymin = min(xs), min(ys)
+    side = (1 << ORDER) - 1
+    xscale = side / ((max(xs) - xmin) or 1)
+    yscale = side / ((max(ys) - ymin) or 1)
+
+    return [
+        index(int((x - xmin) * xscale), int((y - ymin) * yscale), ORDER)
+        for x, y in centres
+    ]
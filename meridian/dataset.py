@@ -17,19 +17,46 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import functools
 import itertools
+import math
+import operator
 import pickle
 import typing
 
+from array import array
 from typing import Tuple, TypeVar, Generic, Iterator
 
 import rtree
 
+from shapely.geometry import Point
+
+from meridian.cache import QueryCache
+from meridian.curves import curve_keys
+from meridian.dissolve import tree_union
+from meridian.indexes import index_types, matches, parse_lookup
+from meridian.quantized import QuantizedGeometry, Quantizer
 from meridian.record import Record
+from meridian.writers import (
+    features_json,
+    fiona_schema,
+    native_formats,
+    open_writer,
+    wkb_array,
+)
 
 
 T = TypeVar("T", bound=Record)
 
+#: An indexed lookup is intersected with the current candidate ids only if it
+#: returns at most this many times as many ids; otherwise it's cheaper to
+#: check the remaining candidates' attributes directly.
+_INTERSECT_RATIO = 4
+
+#: Tokens identifying each Dataset in the keys of a shared QueryCache. Unlike
+#: `id()`, they're never reused once a Dataset is garbage collected.
+_cache_tokens = itertools.count()
+
 
 class FastRTree(rtree.Rtree):
     """A faster Rtree which uses a lower protocol when pickling objects for storage."""
@@ -48,33 +75,148 @@ def _check_bounds(query: typing.Any):
         )
 
 
+def _index_properties(size: int, points: bool) -> rtree.index.Property:
+    """
+    Choose R-tree properties for a bulk loaded, read-only index.
+
+    Small nodes keep the number of entries checked per query low; against the
+    old 1000-entry leaves a small-window query on 200k squares went from 258 to
+    159 µs (about 1.6x, see ``benchmarks/query_latency.py``).
+    Leaves of 16 entries are fastest for points at any size and for other
+    geometries up to ~100k records, after which 32 does better for the
+    (overlapping) boxes of lines and polygons.
+    """
+    properties = rtree.index.Property()
+    properties.dimension = 2
+    properties.fill_factor = 0.999
+    properties.leaf_capacity = 16 if points or size <= 100_000 else 32
+    properties.index_capacity = 32
+    return properties
+
+
+def _expand(
+    bounds: Tuple[float, float, float, float], distance: float
+) -> Tuple[float, float, float, float]:
+    """Grow a bounding box by `distance` on every side."""
+    xmin, ymin, xmax, ymax = bounds
+    return xmin - distance, ymin - distance, xmax + distance, ymax + distance
+
+
+def _bounds_intersect(bounds: Tuple[float, float, float, float], record: Record) -> bool:
+    """Check whether the bounding box of a Record intersects with `bounds`."""
+    xmin, ymin, xmax, ymax = record.bounds
+    return (
+        xmin <= bounds[2]
+        and bounds[0] <= xmax
+        and ymin <= bounds[3]
+        and bounds[1] <= ymax
+    )
+
+
+def _attribute_matches(field: str, op: str, value: typing.Any, record: Record) -> bool:
+    return matches(getattr(record, field), op, value)
+
+
+def _geometry(obj: typing.Any) -> typing.Any:
+    """Get the shapely geometry of a Record, or the object itself if it's a geometry."""
+    return obj.geom if isinstance(obj, Record) else obj
+
+
+def _quantize(record: T, quantizer: Quantizer) -> T:
+    """Store a Record's geometry in quantized form, unless it already is."""
+    geom = record[-1]
+    if isinstance(geom, QuantizedGeometry):
+        if geom.quantizer.precision <= quantizer.precision:
+            return record
+        geom = geom.decode()
+    return record._with_geom(quantizer.encode(geom))
+
+
 class Dataset(Generic[T]):
     """
     The Dataset provides a wrapper for Records, giving the user a way to query
     the Records within spatially.
+
+    Records are stored in the order given unless `order` is "hilbert" or "zorder",
+    in which case they are sorted along that space filling curve, so that Records
+    which are close in space are also close together in the Dataset. This
+    makes iteration, slices and joins driven by the Dataset spatially coherent.
+
+    Attribute indexes declared on the Record type are built along with the
+    spatial index, and used by `where` to find Records by attribute.
+
+    Unless explicit index `properties` are given, they are chosen based on the
+    size of the Dataset and whether it contains only points.
+
+    An optional QueryCache can be attached, either at creation time or later
+    through the `cache` property, to remember the results of repeated queries.
+
+    Given a `precision`, geometries are stored quantized to a grid of that
+    size and delta encoded, which takes several times less memory for lines
+    and polygons. Each coordinate is then within `precision / 2` of the
+    original on each axis. Bounds are kept exact, so bounding box queries
+    are unaffected; shapely geometries are decoded whenever `record.geom` is
+    used, and such Records must be passed to shapely as `record.geom`.
     """
 
     def __init__(
-        self, data: typing.Iterator[T], properties: rtree.index.Property = None,
+        self,
+        data: typing.Iterator[T],
+        properties: rtree.index.Property = None,
+        cache: QueryCache = None,
+        order: str = None,
+        precision: float = None,
     ):
         if not hasattr(data, "__next__"):
             data = iter(data)
 
-        peek = next(data)
+        try:
+            peek = next(data)
+        except StopIteration:
+            raise ValueError("A Dataset needs at least one Record") from None
 
         if not isinstance(peek, Record):
             raise TypeError("Input must be an iterable of SpatialData objects")
 
-        self.__data = tuple(itertools.chain([peek], data))
+        stream: Iterator[T] = itertools.chain([peek], data)
+        if precision is not None:
+            # records are encoded as they're read, so the shapely geometries
+            # never all need to be in memory at once.
+            xmin, ymin, _, _ = peek.bounds
+            quantizer = Quantizer(precision, xmin, ymin)
+            stream = (_quantize(r, quantizer) for r in stream)
+        records: Tuple[T, ...] = tuple(stream)
+        # bounds are packed into one flat array, since getting them from
+        # the geometries every time they're needed is slow.
+        bounds = array("d", itertools.chain.from_iterable(r.bounds for r in records))
+
+        if order is not None:
+            keys = curve_keys(zip(*[iter(bounds)] * 4), order)
+            ordering = sorted(range(len(records)), key=keys.__getitem__)
+            records = tuple(records[i] for i in ordering)
+            bounds = array(
+                "d",
+                itertools.chain.from_iterable(bounds[4 * i:4 * i + 4] for i in ordering),
+            )
+
+        self.__data = records
+        self.__bounds = bounds
+        self.__precision = precision
+        self.__order = order
 
         if properties is None:
-            properties = rtree.index.Property()
-            properties.dimension = 2
-            properties.fill_factor = 0.999
-            properties.leaf_capacity = 1000
+            sample = range(min(len(records), 100))
+            points = all(self._point(i) is not None for i in sample)
+            properties = _index_properties(len(records), points)
 
-        gen = ((idx, sd.bounds, None) for idx, sd in enumerate(self.__data))
+        gen = ((idx, self._bounds(idx), None) for idx in range(len(records)))
         self.__rtree = FastRTree(gen, properties=properties)
+        self.__cache = cache
+        self.__cache_token = next(_cache_tokens)
+        self.__indexes = {
+            field: index_types[kind](getattr(r, field) for r in records)
+            for field, kind in type(peek)._indexes.items()
+        }
 
     def __len__(self) -> int:
         """Number of Records in the Dataset"""
@@ -88,6 +230,34 @@ class Dataset(Generic[T]):
         """Get an item from the Dataset by index."""
         return self.__data[item]
 
+    def __reduce__(self) -> Tuple[typing.Any, ...]:
+        """
+        Pickle the Records only, e.g. to send the Dataset to worker processes,
+        which rebuild its indexes. An attached cache isn't included.
+        """
+        return Dataset, (self.__data, None, None, self.__order, self.__precision)
+
+    @property
+    def cache(self) -> typing.Optional[QueryCache]:
+        """The QueryCache used for this Dataset's queries, if any."""
+        return self.__cache
+
+    @cache.setter
+    def cache(self, cache: typing.Optional[QueryCache]) -> None:
+        self.__cache = cache
+
+    def _cached(self, name: str, bounds, compute: typing.Callable, *args) -> typing.Any:
+        """Run `compute(bounds, *args)`, going through the cache if there is one."""
+        if self.__cache is None:
+            return compute(bounds, *args)
+        key = self.__cache.key(self.__cache_token, name, bounds, *args)
+        return self.__cache.get(key, lambda: compute(bounds, *args))
+
+    @property
+    def precision(self) -> typing.Optional[float]:
+        """The grid size geometries are quantized to, or None if they're stored as is."""
+        return self.__precision
+
     @property
     def bounds(self) -> Tuple[float, float, float, float]:
         """
@@ -110,7 +280,10 @@ class Dataset(Generic[T]):
 
         """
         _check_bounds(query)
-        return self.__rtree.count(query.bounds) != 0
+        return self._cached("intersects", query.bounds, self._intersects)
+
+    def _intersects(self, bounds) -> bool:
+        return self.__rtree.count(bounds) != 0
 
     def intersection(self, query) -> Tuple[T, ...]:
         """
@@ -125,7 +298,40 @@ class Dataset(Generic[T]):
             SpatialDataset of intersecting objects
         """
         _check_bounds(query)
-        return tuple(self.__data[i] for i in self.__rtree.intersection(query.bounds))
+        return self._cached("intersection", query.bounds, self._intersection)
+
+    def _intersection(self, bounds) -> Tuple[T, ...]:
+        return tuple(self.__data[i] for i in self.__rtree.intersection(bounds))
+
+    def _bounds(self, idx: int) -> Tuple[float, float, float, float]:
+        """The bounds of the Record at position `idx`, without going through shapely."""
+        xmin, ymin, xmax, ymax = self.__bounds[4 * idx:4 * idx + 4]
+        return xmin, ymin, xmax, ymax
+
+    def _point(self, idx: int) -> typing.Optional[Tuple[float, float]]:
+        """The location of the Record at position `idx`, if its geometry is a point."""
+        xmin, ymin, xmax, ymax = self.__bounds[4 * idx:4 * idx + 4]
+        if xmin == xmax and ymin == ymax:
+            return xmin, ymin
+        return None
+
+    def _distance(self, idx: int, geom, bounds) -> float:
+        """
+        Exact distance from the Record at position `idx` to `geom`, whose `bounds`
+        are given. Pairs of points are measured directly from their bounds.
+        """
+        point = self._point(idx)
+        if point is not None and bounds[0] == bounds[2] and bounds[1] == bounds[3]:
+            return math.hypot(point[0] - bounds[0], point[1] - bounds[1])
+        return self.__data[idx].geom.distance(geom)
+
+    def _intersection_ids(self, bounds) -> Iterator[int]:
+        """The positions of the Records whose bounds intersect with `bounds`."""
+        return self.__rtree.intersection(bounds)
+
+    def _nearest_ids(self, bounds, num_results: int) -> Iterator[int]:
+        """The positions of the Records nearest to `bounds`, by bounding box distance."""
+        return self.__rtree.nearest(bounds, num_results)
 
     def count(self, query) -> int:
         """
@@ -140,7 +346,10 @@ class Dataset(Generic[T]):
             int
         """
         _check_bounds(query)
-        return int(self.__rtree.count(query.bounds))
+        return self._cached("count", query.bounds, self._count)
+
+    def _count(self, bounds) -> int:
+        return int(self.__rtree.count(bounds))
 
     def nearest(self, query, num_results=1) -> Tuple[T, ...]:
         """
@@ -155,4 +364,229 @@ class Dataset(Generic[T]):
             tuple of nearest records
         """
         _check_bounds(query)
-        return tuple(self[i] for i in self.__rtree.nearest(query.bounds, num_results))
+        return self._cached("nearest", query.bounds, self._nearest, num_results)
+
+    def _nearest(self, bounds, num_results: int) -> Tuple[T, ...]:
+        return tuple(self[i] for i in self.__rtree.nearest(bounds, num_results))
+
+    def query_dwithin(self, query, distance: float) -> Tuple[T, ...]:
+        """
+        Find the Records within `distance` of the query object.
+
+        Unlike the other spatial methods, this is an exact test: the query bounds
+        are expanded by `distance` to probe the index, then the true distance
+        to each candidate is checked. Point-to-point pairs are compared by
+        squared distance, using the bounds stored in the Dataset, without
+        calling into GEOS. Only point queries are
+        cached, since the bounds of anything else don't identify its geometry.
+
+        Args:
+            query: a shapely geometry or Record
+            distance: the maximum distance, in the units of the data
+
+        Returns:
+            tuple of Records within the distance
+        """
+        _check_bounds(query)
+        if distance < 0:
+            raise ValueError("distance must not be negative")
+
+        geom = _geometry(query)
+        if isinstance(geom, Point):
+            return self._cached("dwithin", query.bounds, self._dwithin_point, distance)
+
+        return tuple(
+            r
+            for r in self._intersection(_expand(query.bounds, distance))
+            if r.geom.distance(geom) <= distance
+        )
+
+    def _dwithin_point(self, bounds, distance: float) -> Tuple[T, ...]:
+        x, y = bounds[:2]
+        query = None
+        max_sq = distance * distance
+        results = []
+        for idx in self.__rtree.intersection(_expand(bounds, distance)):
+            point = self._point(idx)
+            if point is not None:
+                if (point[0] - x) ** 2 + (point[1] - y) ** 2 <= max_sq:
+                    results.append(self.__data[idx])
+                continue
+
+            if query is None:
+                query = Point(x, y)
+            if self.__data[idx].geom.distance(query) <= distance:
+                results.append(self.__data[idx])
+        return tuple(results)
+
+    def iter_geojson(self) -> Iterator[str]:
+        """
+        Lazily serialize each Record in the Dataset to a GeoJSON Feature string.
+
+        Records are serialized in batches of 1000. This skips building the
+        `__geo_interface__` of every Record and, with Shapely 2, encodes each
+        batch of geometries in one call, so it's faster than calling
+        `json.dumps(record.geojson)` in a loop.
+        """
+        for start in range(0, len(self.__data), 1000):
+            batch = self.__data[start:start + 1000]
+            rows = [(dict(zip(r.__annotations__, r)), r.geom) for r in batch]
+            yield from features_json(rows)
+
+    def to_wkb_array(self) -> Tuple[bytes, ...]:
+        """
+        Serialize the geometry of every Record in the Dataset to WKB. With
+        Shapely 2 they're all encoded in one call.
+
+        Returns:
+            tuple of bytes, in the same order as the Dataset
+        """
+        # every Record has a geometry, so none of these are None
+        return typing.cast(
+            Tuple[bytes, ...], tuple(wkb_array([r.geom for r in self.__data]))
+        )
+
+    def to_file(
+        self, path: typing.Any, driver: str = "geojson", batch_size: int = 1000
+    ) -> int:
+        """
+        Write the Dataset to a file, in batches of `batch_size` Records.
+
+        "csv", "geojson", "geojsonseq" and "parquet" (which requires pyarrow)
+        are written natively. Any other driver name is passed to fiona, with a
+        schema built from the Record annotations, e.g. "ESRI Shapefile" or "GPKG".
+
+        Args:
+            path: the output file path
+            driver: the output format
+            batch_size: number of Records to buffer before writing
+
+        Returns:
+            the number of Records written
+        """
+        types = self.__data[0].__annotations__
+        schema = None
+        if driver not in native_formats:
+            schema = fiona_schema(types, {r[-1].geom_type for r in self.__data})
+
+        with open_writer(
+            path, driver, batch_size=batch_size, schema=schema, types=types
+        ) as writer:
+            for r in self.__data:
+                writer.write(dict(zip(r.__annotations__, r)), r.geom)
+        return writer.count
+
+    def where(self, query=None, **lookups: typing.Any) -> Tuple[T, ...]:
+        """
+        Find the Records matching all of the attribute lookups and, if a query
+        is given, whose bounding boxes intersect with it.
+
+        Lookups are field names, optionally followed by one of the operators
+        `__ne`, `__gt`, `__gte`, `__lt`, `__lte` or `__in`, e.g.
+        `where(state_geom, primsource="solar", install_mw__gt=100)`.
+
+        The index (attribute or spatial) expected to return the fewest Records
+        is used as a starting point. Results from other indexes are intersected
+        with it when they're similarly selective, and everything else is
+        checked directly on the remaining Records. Without any usable index,
+        every Record is checked.
+
+        Args:
+            query: an optional object which exposes a `bounds` property
+            lookups: field lookups which the Records must match
+
+        Returns:
+            tuple of matching Records, in Dataset order
+        """
+        # (estimated number of ids, fetch the ids, check a Record directly)
+        plans: typing.List[Tuple[int, functools.partial, functools.partial]] = []
+        checks = []
+        for lookup, value in lookups.items():
+            field, op = parse_lookup(lookup)
+            check = functools.partial(_attribute_matches, field, op, value)
+            index = self.__indexes.get(field)
+            if index is None or op not in index.operators:
+                checks.append(check)
+                continue
+            try:
+                estimate = index.estimate(op, value)
+            except TypeError:
+                # the value can't be looked up in the index; check the Records instead.
+                checks.append(check)
+                continue
+            plans.append((estimate, functools.partial(index.lookup, op, value), check))
+
+        if query is not None:
+            _check_bounds(query)
+            bounds = query.bounds
+            fetch = functools.partial(self.__rtree.intersection, bounds)
+            check = functools.partial(_bounds_intersect, bounds)
+            plans.append((self.__rtree.count(bounds), fetch, check))
+
+        if not plans:
+            return tuple(r for r in self.__data if all(check(r) for check in checks))
+
+        plans.sort(key=operator.itemgetter(0))
+        ids = set(plans[0][1]())
+        for estimate, fetch, check in plans[1:]:
+            if estimate <= _INTERSECT_RATIO * len(ids):
+                ids.intersection_update(fetch())
+            else:
+                checks.append(check)
+
+        candidates = (self.__data[i] for i in sorted(ids))
+        return tuple(r for r in candidates if all(check(r) for check in checks))
+
+    def dissolve(
+        self, by: str, workers: int = None, chunk_size: int = 256
+    ) -> "Dataset[T]":
+        """
+        Merge the geometries of all Records with the same value of the field `by`,
+        e.g. parcels into blocks or counties into states.
+
+        With `workers`, the Records of each group are taken in Hilbert curve
+        order (or the Dataset's own order, if it has one) and unioned in chunks of
+        neighbours across a pool of worker processes, whose results are unioned
+        in turn. Chunks from all groups share the pool, so a few large groups are
+        spread across it as well as many small ones.
+
+        Args:
+            by: the name of the field to group Records by
+            workers: if more than 1, the number of processes to union in
+            chunk_size: the number of geometries unioned at a time by each worker
+
+        Returns:
+            A Dataset with one Record of the same type per group, in order of
+            each group's first appearance, with only `by` and the geometry set.
+            It has the same precision as this Dataset.
+        """
+        record_type = type(self.__data[0])
+        if by not in record_type.__annotations__:
+            raise ValueError(f"Cannot dissolve by {by}, it is not a field")
+
+        groups = {}  # type: typing.Dict[typing.Any, typing.List[int]]
+        for idx, record in enumerate(self.__data):
+            groups.setdefault(getattr(record, by), []).append(idx)
+
+        if workers is not None and workers > 1 and self.__order is None:
+            for ids in groups.values():
+                keys = curve_keys(self._bounds(i) for i in ids)
+                ids[:] = [ids[i] for i in sorted(range(len(ids)), key=keys.__getitem__)]
+
+        geoms = {
+            value: [self.__data[i].geom for i in ids] for value, ids in groups.items()
+        }
+        unions = tree_union(geoms, workers, chunk_size)
+        # built directly, since __new__ would fill in defaults for the other fields
+        # and for any falsy value of `by`.
+        fields = list(record_type.__annotations__)
+        return Dataset(
+            (
+                tuple.__new__(
+                    record_type,
+                    (*[value if f == by else None for f in fields], unions[value]),
+                )
+                for value in groups
+            ),
+            precision=self.__precision,
+        )
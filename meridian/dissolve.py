@@ -0,0 +1,100 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from typing import Any, Dict, List, Sequence, Tuple
+
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import unary_union
+
+from meridian.parallel import worker_pool, worker_state
+
+
+def _union(geoms: Sequence[BaseGeometry]) -> BaseGeometry:
+    return unary_union(geoms)
+
+
+def _union_chunk(chunk: Tuple[Any, int, int]) -> BaseGeometry:
+    key, start, stop = chunk
+    return unary_union(worker_state()[key][start:stop])
+
+
+def tree_union(
+    groups: Dict[Any, List[BaseGeometry]], workers: int = None, chunk_size: int = 256
+) -> Dict[Any, BaseGeometry]:
+    """
+    Union each group of geometries.
+
+    In a single process, each group is unioned in one go: GEOS's unary union
+    is already a cascaded union, merging neighbours found through an STR-tree
+    first. With `workers`, groups are split into chunks of `chunk_size`
+    consecutive geometries, which are unioned across the worker processes;
+    the results are chunked and unioned again until each group is down to one
+    geometry. Given geometries in spatial order, each chunk holds near
+    neighbours, so most shared edges are dissolved at the first level.
+
+    Args:
+        groups: lists of geometries to union, in spatial order, by group key
+        workers: if more than 1, the number of processes to union chunks in.
+        chunk_size: the number of geometries unioned at a time by each worker
+
+    Returns:
+        dict of the union of each group, by group key
+    """
+    if workers is None or workers <= 1:
+        return {key: unary_union(geoms) for key, geoms in groups.items()}
+
+    if chunk_size < 2:
+        raise ValueError("chunk_size must be at least 2")
+
+    chunks = [
+        (key, start, start + chunk_size)
+        for key, geoms in groups.items()
+        for start in range(0, len(geoms), chunk_size)
+    ]
+
+    unions = {}  # type: Dict[Any, BaseGeometry]
+    with worker_pool(workers, groups) as pool:
+        partials = _collect(chunks, pool.map(_union_chunk, chunks), unions)
+        while partials:
+            pieces = [
+                (key, geoms[start:start + chunk_size])
+                for key, geoms in partials.items()
+                for start in range(0, len(geoms), chunk_size)
+            ]
+            results = pool.map(_union, [geoms for _, geoms in pieces])
+            partials = _collect(pieces, results, unions)
+    return unions
+
+
+def _collect(
+    tasks: Sequence[Tuple[Any, ...]],
+    results: Sequence[BaseGeometry],
+    unions: Dict[Any, BaseGeometry],
+) -> Dict[Any, List[BaseGeometry]]:
+    """
+    Gather the results of a level of unions by group, moving groups which are
+    down to one geometry into `unions` and returning the rest.
+    """
+    partials = {}  # type: Dict[Any, List[BaseGeometry]]
+    for task, geom in zip(tasks, results):
+        partials.setdefault(task[0], []).append(geom)
+
+    for key in [key for key, geoms in partials.items() if len(geoms) == 1]:
+        unions[key] = partials.pop(key)[0]
+    return partials
@@ -0,0 +1,198 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import bisect
+import numbers
+import operator
+
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+_operators: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda value, options: value in options,
+}
+
+
+def parse_lookup(lookup: str) -> Tuple[str, str]:
+    """
+    Split a lookup like "install_mw__gt" into its field and operator.
+    A lookup without a known operator suffix is an equality test.
+    """
+    field, sep, op = lookup.rpartition("__")
+    if sep and op in _operators:
+        return field, op
+    return lookup, "eq"
+
+
+def matches(value: Any, op: str, target: Any) -> bool:
+    """Test a value against a lookup. Values which can't be compared don't match."""
+    try:
+        return bool(_operators[op](value, target))
+    except TypeError:
+        return False
+
+
+def _is_collection(target: Any) -> bool:
+    """Whether `target` can be used as the options of an "in" lookup by an index."""
+    return isinstance(target, Collection) and not isinstance(target, (str, bytes))
+
+
+def _matching(others: List[Tuple[Any, int]], op: str, target: Any) -> List[int]:
+    """The ids of the unindexed values which match the lookup."""
+    return [idx for value, idx in others if matches(value, op, target)]
+
+
+def _in_targets(target: Any) -> Collection:
+    if not _is_collection(target):
+        raise TypeError(f"Can't use {target!r} for an indexed 'in' lookup")
+    return target
+
+
+class HashIndex:
+    """
+    An index of record ids by exact field value, for "eq" and "in" lookups.
+    Unhashable values are kept aside and checked one by one.
+
+    `estimate` and `lookup` raise TypeError for targets which can't be looked
+    up in the index, in which case the records should be checked directly.
+    """
+
+    operators = ("eq", "in")
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        self._ids: Dict[Any, List[int]] = {}
+        self._others: List[Tuple[Any, int]] = []
+        for idx, value in enumerate(values):
+            try:
+                self._ids.setdefault(value, []).append(idx)
+            except TypeError:
+                self._others.append((value, idx))
+
+    def _targets(self, op: str, target: Any) -> Collection:
+        targets = _in_targets(target) if op == "in" else (target,)
+        for t in targets:
+            hash(t)
+        return targets
+
+    def estimate(self, op: str, target: Any) -> int:
+        """The exact number of ids `lookup` would return."""
+        targets = self._targets(op, target)
+        others = _matching(self._others, op, target)
+        return sum(len(self._ids.get(t, ())) for t in targets) + len(others)
+
+    def lookup(self, op: str, target: Any) -> Sequence[int]:
+        ids = [idx for t in self._targets(op, target) for idx in self._ids.get(t, ())]
+        return ids + _matching(self._others, op, target)
+
+
+def _sort_group(value: Any) -> Any:
+    """Values in the same group can be ordered against each other."""
+    if value is None or value != value:
+        return None
+    if isinstance(value, numbers.Real):
+        return numbers.Real
+    return type(value)
+
+
+class SortedIndex:
+    """
+    An index of record ids sorted by field value, for range lookups as well as
+    "eq" and "in".
+
+    Only the most common group of mutually comparable values (e.g. numbers)
+    is sorted. Anything else, such as None, NaN or an "N/A" string in a
+    numeric field, is kept aside and checked one by one, so lookups match
+    exactly what checking each record would.
+    """
+
+    operators = ("eq", "in", "gt", "gte", "lt", "lte")
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        groups: Dict[Any, List[Tuple[Any, int]]] = {}
+        for idx, value in enumerate(values):
+            groups.setdefault(_sort_group(value), []).append((value, idx))
+
+        pairs: List[Tuple[Any, int]] = []
+        comparable = [group for group in groups if group is not None]
+        if comparable:
+            largest = max(comparable, key=lambda group: len(groups[group]))
+            try:
+                pairs = sorted(groups[largest], key=operator.itemgetter(0))
+                del groups[largest]
+            except TypeError:
+                pass
+
+        self._keys = [v for v, _ in pairs]
+        self._ids = [idx for _, idx in pairs]
+        self._others = [pair for group in groups.values() for pair in group]
+
+    def _range(self, op: str, target: Any) -> Tuple[int, int]:
+        keys = self._keys
+        if _sort_group(target) is None:
+            # None and NaN don't compare with any sorted value.
+            return 0, 0
+        try:
+            if op == "eq":
+                return bisect.bisect_left(keys, target), bisect.bisect_right(keys, target)
+            if op == "gt":
+                return bisect.bisect_right(keys, target), len(keys)
+            if op == "gte":
+                return bisect.bisect_left(keys, target), len(keys)
+            if op == "lt":
+                return 0, bisect.bisect_left(keys, target)
+            return 0, bisect.bisect_right(keys, target)
+        except TypeError:
+            # the target can't be compared with the sorted values, so none match.
+            return 0, 0
+
+    def _ranges(self, op: str, target: Any) -> List[Tuple[int, int]]:
+        if op == "in":
+            return [self._range("eq", t) for t in _in_targets(target)]
+        return [self._range(op, target)]
+
+    def estimate(self, op: str, target: Any) -> int:
+        """The exact number of ids `lookup` would return."""
+        sizes = (max(hi - lo, 0) for lo, hi in self._ranges(op, target))
+        return sum(sizes) + len(_matching(self._others, op, target))
+
+    def lookup(self, op: str, target: Any) -> Sequence[int]:
+        ids = [idx for lo, hi in self._ranges(op, target) for idx in self._ids[lo:hi]]
+        return ids + _matching(self._others, op, target)
+
+
+index_types: Dict[str, Type[Union[HashIndex, SortedIndex]]] = {
+    "hash": HashIndex,
+    "sorted": SortedIndex,
+}
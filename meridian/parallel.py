@@ -0,0 +1,50 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import contextlib
+import multiprocessing
+
+from typing import Any, Iterator
+
+# The shared state of the pool this process is a worker in, if any.
+_state: Any = None
+
+
+def _initialize(state: Any) -> None:
+    global _state
+    _state = state
+
+
+def worker_state() -> Any:
+    """The `state` given to the `worker_pool` this worker process belongs to."""
+    return _state
+
+
+@contextlib.contextmanager
+def worker_pool(workers: int, state: Any) -> Iterator[Any]:
+    """
+    A process pool whose workers can all read `state` through `worker_state`.
+
+    The state is handed to each worker as it starts rather than with every
+    task, so large inputs like Datasets are only transferred once per worker.
+    Where processes are forked it's inherited without being pickled at all.
+    """
+    pool = multiprocessing.Pool(workers, initializer=_initialize, initargs=(state,))
+    with pool:
+        yield pool
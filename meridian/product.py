@@ -17,11 +17,22 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from typing import Iterator, Tuple, TypeVar
+import collections
+import functools
+import heapq
+import itertools
+import json
+import pathlib
+
+from typing import IO, Any, Deque, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
 
 from shapely.prepared import prep
 
 from meridian import Dataset, Record
+from meridian.curves import curve_keys
+from meridian.dataset import _expand
+from meridian.parallel import worker_pool, worker_state
+from meridian.writers import open_writer
 
 _T = TypeVar("_T", bound=Record)
 _U = TypeVar("_U", bound=Record)
@@ -39,6 +50,14 @@ _allowed_prepared_predicates = (
 )
 
 
+_symmetric_predicates = (
+    "intersects",
+    "crosses",
+    "overlaps",
+    "touches",
+)
+
+
 def _error_callback(error: Exception, record: Record) -> dict:
     return {
         'error': str(error),
@@ -46,7 +65,7 @@ def _error_callback(error: Exception, record: Record) -> dict:
     }
 
 
-class Product:
+class Product(Generic[_T, _U]):
     """
     Product represents a "spatial join" between two Datasets. It wraps an iterator of Record
     tuples which fulfill the chosen predicate.
@@ -56,51 +75,303 @@ class Product:
     match the second.
 
     the outer loop's geometry is prepared so predicates will be efficient.
+
+    The "dwithin" predicate matches Records within `distance` of each other, using an
+    exact distance test rather than buffered geometries.
+
+    Errors raised while evaluating the predicate are passed to `error_callback` and kept
+    in memory. For very large or dirty inputs, `max_errors` keeps only the most recent
+    errors, and `error_log` spills every error to a newline-delimited JSON file instead,
+    so memory use stays constant.
     """
-    def __init__(self, d1: Dataset[_T], d2: Dataset[_U], predicate="intersects", error_callback=None) -> None:
-        if predicate not in _allowed_prepared_predicates:
+    def __init__(
+        self,
+        d1: Dataset[_T],
+        d2: Dataset[_U],
+        predicate="intersects",
+        error_callback=None,
+        max_errors: int = None,
+        error_log: Any = None,
+        distance: float = None,
+    ) -> None:
+        if predicate == "dwithin":
+            if distance is None:
+                raise ValueError("A distance is required for the dwithin predicate")
+            if distance < 0:
+                raise ValueError("distance must not be negative")
+        elif distance is not None:
+            raise ValueError("A distance can only be given for the dwithin predicate")
+        elif predicate not in _allowed_prepared_predicates:
             raise ValueError(
-                f"Predicate must be one of {','.join(_allowed_prepared_predicates)}"
+                "Predicate must be one of "
+                f"dwithin,{','.join(_allowed_prepared_predicates)}"
             )
 
         self._d1 = d1
         self._d2 = d2
         self._predicate = predicate
-        self._errors = []
-        self._total_processed = None
+        # only used by the dwithin predicate, which requires it
+        self._distance: float = distance or 0.0
+        self._errors: Deque[Any] = collections.deque(maxlen=max_errors)
+        self._error_count = 0
+        self._error_log = pathlib.Path(error_log) if error_log is not None else None
+        self._error_file: Optional[IO[str]] = None
+        self._total_processed: Optional[int] = None
         self._error_callback = error_callback or _error_callback
 
     def __iter__(self):
+        return self._logging_errors(self._pairs())
+
+    def _logging_errors(self, pairs: Iterator[Any]) -> Iterator[Any]:
+        if self._error_log is not None:
+            self._error_file = open(self._error_log, "w")
+
+        try:
+            yield from pairs
+        finally:
+            if self._error_file is not None:
+                self._error_file.close()
+                self._error_file = None
+
+    def _pairs(self) -> Iterator[Tuple[_T, _U]]:
+        packed = isinstance(self._d1, Dataset)
+        idx = -1
         for idx, r1 in enumerate(self._d1):
-            records = self._d2.intersection(r1)
+            if self._predicate == "dwithin":
+                yield from self._dwithin(r1)
+                continue
+
+            bounds = self._d1._bounds(idx) if packed else r1.bounds
+            records = self._d2._intersection(bounds)
             if not records:
                 continue
 
-            prepped = prep(r1)
+            prepped = prep(r1.geom)
             for r2 in records:
                 try:
-                    if getattr(prepped, self._predicate)(r2):
+                    if getattr(prepped, self._predicate)(r2.geom):
                         yield r1, r2
                 except Exception as e:
-                    self._errors.append(self._error_callback(e, r2))
+                    self._add_error(self._error_callback(e, r2))
 
-        self._total_processed = idx
+        self._total_processed = idx + 1
 
     def __len__(self) -> int:
+        """The number of Records from the first Dataset which have been processed."""
         if self._total_processed is None:
             raise TypeError("Product has no len before it has been run.")
         return self._total_processed
 
+    def _dwithin(self, r1: _T) -> Iterator[Tuple[_T, _U]]:
+        try:
+            records = self._d2.query_dwithin(r1, self._distance)
+        except Exception as e:
+            self._add_error(self._error_callback(e, r1))
+            return
+
+        for r2 in records:
+            yield r1, r2
+
+    def _add_error(self, error: Any) -> None:
+        self._error_count += 1
+        if self._error_file is not None:
+            self._error_file.write(json.dumps(error, default=str) + "\n")
+        else:
+            self._errors.append(error)
+
+    @property
+    def errors(self) -> List[Any]:
+        """
+        The errors encountered so far, as a list. If an `error_log` was given,
+        they are all read back from it; otherwise at most `max_errors` are kept.
+        """
+        return list(self.iter_errors())
+
     @property
-    def errors(self):
-        return self._errors
+    def error_count(self) -> int:
+        """Total number of errors encountered, including any that were dropped."""
+        return self._error_count
+
+    def iter_errors(self) -> Iterator[Any]:
+        """
+        Iterate over the errors encountered so far. If an `error_log` was given,
+        they are read back from it lazily, so they never need to all be in memory.
+        """
+        if self._error_log is None:
+            yield from list(self._errors)
+            return
+        if not self._error_log.exists():
+            return
+        with open(self._error_log) as f:
+            for line in f:
+                yield json.loads(line)
+
+    def to_file(
+        self,
+        path: Any,
+        format: str = "geojsonseq",
+        batch_size: int = 1000,
+        prefixes: Tuple[str, str] = ("left_", "right_"),
+    ) -> int:
+        """
+        Run the Product and stream the matching pairs to a file in batches, so
+        results never need to be held in memory.
+
+        Each pair is written as one row whose geometry is that of the left Record,
+        and whose columns are the attributes of both Records, prefixed to avoid
+        name clashes.
+
+        Args:
+            path: the output file path
+            format: one of "csv", "geojson", "geojsonseq" or "parquet"
+            batch_size: number of rows to buffer before writing
+            prefixes: prefixes for the left and right Records' attribute names
+
+        Returns:
+            the number of pairs written
+        """
+        left, right = prefixes
+        pairs = iter(self)
+        first = next(pairs, None)
+        types = {}  # type: Dict[str, Any]
+        if first is not None:
+            pairs = itertools.chain([first], pairs)
+            for prefix, record in zip(prefixes, first):
+                types.update((prefix + k, v) for k, v in record.__annotations__.items())
+
+        with open_writer(path, format, batch_size=batch_size, types=types) as writer:
+            for r1, r2 in pairs:
+                props = collections.OrderedDict(
+                    (left + name, value) for name, value in zip(r1.__annotations__, r1)
+                )
+                props.update(
+                    (right + name, value) for name, value in zip(r2.__annotations__, r2)
+                )
+                writer.write(props, r1.geom)
+        return writer.count
+
+
+class SelfJoin(Product[_T, _T]):
+    """
+    SelfJoin is a Product of a Dataset with itself, which reports each matching pair
+    of Records only once, as (dataset[i], dataset[j]) with i < j, and never pairs a
+    Record with itself. Only symmetric predicates are allowed, so that one test per
+    pair is enough.
+
+    The index is walked once, and each Record's geometry is prepared at most once,
+    to test against all of the Records after it.
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset[_T],
+        predicate="intersects",
+        error_callback=None,
+        max_errors: int = None,
+        error_log: Any = None,
+        distance: float = None,
+    ) -> None:
+        if predicate != "dwithin" and predicate not in _symmetric_predicates:
+            raise ValueError(
+                f"Predicate must be one of dwithin,{','.join(_symmetric_predicates)}"
+            )
+
+        super().__init__(
+            dataset,
+            dataset,
+            predicate,
+            error_callback=error_callback,
+            max_errors=max_errors,
+            error_log=error_log,
+            distance=distance,
+        )
+
+    def _id_pairs(self) -> Iterator[Tuple[int, int]]:
+        dataset = self._d1
+        dwithin = self._predicate == "dwithin"
+
+        for i, r1 in enumerate(dataset):
+            bounds = dataset._bounds(i)
+            probe = _expand(bounds, self._distance) if dwithin else bounds
+            later = sorted(j for j in dataset._intersection_ids(probe) if j > i)
+            if not later:
+                continue
 
+            geom = r1.geom
+            if not dwithin:
+                test = getattr(prep(geom), self._predicate)
+            for j in later:
+                r2 = dataset[j]
+                try:
+                    if dwithin:
+                        matched = dataset._distance(j, geom, bounds) <= self._distance
+                    else:
+                        matched = test(r2.geom)
+                    if matched:
+                        yield i, j
+                except Exception as e:
+                    self._add_error(self._error_callback(e, r2))
+
+        self._total_processed = len(dataset)
+
+    def _pairs(self) -> Iterator[Tuple[_T, _T]]:
+        dataset = self._d1
+        for i, j in self._id_pairs():
+            yield dataset[i], dataset[j]
+
+    def clusters(self) -> List[Tuple[_T, ...]]:
+        """
+        Run the SelfJoin and group the Records into clusters which are connected
+        by matching pairs, e.g. sets of duplicates or of overlapping polygons.
+        Records which match nothing are left out.
+
+        Returns:
+            list of tuples of Records, each tuple in Dataset order
+        """
+        dataset = self._d1
+        parent: Dict[int, int] = {}
+
+        def find(i: int) -> int:
+            root = parent.setdefault(i, i)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        for i, j in self._logging_errors(self._id_pairs()):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        groups: Dict[int, List[int]] = collections.defaultdict(list)
+        for i in sorted(parent):
+            groups[find(i)].append(i)
+
+        return [tuple(dataset[i] for i in members) for members in groups.values()]
 
-def product(d1: Dataset[_T], d2: Dataset[_U], predicate: str = "intersects") -> Iterator[Tuple[_T, _U]]:
+
+def self_join(
+    dataset: Dataset[_T],
+    predicate: str = "intersects",
+    distance: float = None,
+) -> Iterator[Tuple[_T, _T]]:
+    """
+    Helper function to join a Dataset with itself, yielding each matching pair once.
+    To group the Records into clusters instead, use `SelfJoin(...).clusters()`.
+    """
+    return iter(SelfJoin(dataset, predicate, distance=distance))
+
+
+def product(
+    d1: Dataset[_T],
+    d2: Dataset[_U],
+    predicate: str = "intersects",
+    distance: float = None,
+) -> Iterator[Tuple[_T, _U]]:
     """
     Helper function if you don't care about metadata like errors etc.
     """
-    yield from Product(d1, d2, predicate)
+    yield from Product(d1, d2, predicate, distance=distance)
 
 
 def intersection(d1: Dataset[_T], d2: Dataset[_U]) -> Iterator[Tuple[_T, _U]]:
@@ -108,3 +379,116 @@ def intersection(d1: Dataset[_T], d2: Dataset[_U]) -> Iterator[Tuple[_T, _U]]:
     A special case of `Product` based on the "intersects" predicate.
     """
     yield from Product(d1, d2, predicate="intersects")
+
+
+def _knn(
+    d2: Dataset[_U],
+    record: Record,
+    bounds: Tuple[float, float, float, float],
+    k: int,
+    max_distance: Optional[float],
+) -> List[Tuple[float, int]]:
+    """
+    Find the k nearest Records in d2 to `record`, whose bounds are given, by exact
+    distance.
+
+    The index ranks by bounding box distance, which is never more than the exact
+    distance. So once the exact distance to the k bbox-nearest candidates is
+    known, the true k nearest must all lie within that distance of the
+    Record's bounds, and only those need to be checked.
+    """
+    geom = record.geom
+    distances = {j: d2._distance(j, geom, bounds) for j in d2._nearest_ids(bounds, k)}
+    if not distances:
+        return []
+
+    radius = heapq.nsmallest(k, distances.values())[-1]
+    if max_distance is not None:
+        radius = min(radius, max_distance)
+
+    for j in d2._intersection_ids(_expand(bounds, radius)):
+        if j not in distances:
+            distances[j] = d2._distance(j, geom, bounds)
+
+    nearest = heapq.nsmallest(k, ((d, j) for j, d in distances.items()))
+    if max_distance is not None:
+        nearest = [(d, j) for d, j in nearest if d <= max_distance]
+    return nearest
+
+
+def _knn_batch(
+    d1: Dataset[_T],
+    d2: Dataset[_U],
+    k: int,
+    max_distance: Optional[float],
+    batch: List[int],
+) -> List[Tuple[int, int, float]]:
+    return [
+        (i, j, d)
+        for i in batch
+        for d, j in _knn(d2, d1[i], d1._bounds(i), k, max_distance)
+    ]
+
+
+def _knn_worker(batch: List[int]) -> List[Tuple[int, int, float]]:
+    d1, d2, k, max_distance = worker_state()
+    return _knn_batch(d1, d2, k, max_distance, batch)
+
+
+def knn_join(
+    d1: Dataset[_T],
+    d2: Dataset[_U],
+    k: int = 1,
+    max_distance: float = None,
+    workers: int = None,
+    batch_size: int = 256,
+) -> Iterator[Tuple[_T, _U, float]]:
+    """
+    Find the k nearest Records in d2 to each Record in d1, ranked by exact distance.
+
+    d1 is processed in batches of Records which are close together along a Hilbert
+    curve, so consecutive queries visit the same parts of d2's index. Results for
+    each d1 Record are yielded together, nearest first, but the d1 Records
+    come in that spatial order rather than in Dataset order.
+
+    Args:
+        d1: the Dataset to find neighbours for
+        d2: the Dataset to find neighbours in
+        k: the number of neighbours for each Record
+        max_distance: if given, neighbours further away than this are left out
+        workers: if more than 1, the number of processes to spread batches over.
+        batch_size: the number of d1 Records in each batch
+
+    Returns:
+        iterator of (d1 Record, d2 Record, distance) tuples
+    """
+    if k < 1:
+        raise ValueError("k must be a positive integer")
+    if batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+
+    # the checks above run when knn_join is called, not when iteration starts.
+    return _knn_join(d1, d2, k, max_distance, workers, batch_size)
+
+
+def _knn_join(
+    d1: Dataset[_T],
+    d2: Dataset[_U],
+    k: int,
+    max_distance: Optional[float],
+    workers: Optional[int],
+    batch_size: int,
+) -> Iterator[Tuple[_T, _U, float]]:
+    keys = curve_keys(d1._bounds(i) for i in range(len(d1)))
+    ordering = sorted(range(len(d1)), key=keys.__getitem__)
+    batches = [ordering[i:i + batch_size] for i in range(0, len(ordering), batch_size)]
+
+    if workers is not None and workers > 1:
+        with worker_pool(workers, (d1, d2, k, max_distance)) as pool:
+            results = itertools.chain.from_iterable(pool.imap(_knn_worker, batches))
+            for i, j, distance in results:
+                yield d1[i], d2[j], distance
+    else:
+        run = functools.partial(_knn_batch, d1, d2, k, max_distance)
+        for i, j, distance in itertools.chain.from_iterable(map(run, batches)):
+            yield d1[i], d2[j], distance
@@ -0,0 +1,232 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import itertools
+
+from array import array
+from typing import Any, Dict, List, Sequence, Tuple
+
+from shapely.geometry import (
+    LineString,
+    MultiLineString,
+    MultiPoint,
+    MultiPolygon,
+    Point,
+    Polygon,
+)
+from shapely.geometry.base import BaseGeometry
+
+Coords = List[Tuple[float, float]]
+
+
+def _typecode(values: Sequence[int]) -> str:
+    """The smallest signed array typecode which can hold all of `values`."""
+    largest = max((abs(v) for v in values), default=0)
+    for typecode, limit in (("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31)):
+        if largest < limit:
+            return typecode
+    return "q"
+
+
+def _rings(polygon: Polygon) -> List[Coords]:
+    return [list(polygon.exterior.coords)] + [list(r.coords) for r in polygon.interiors]
+
+
+def _flatten(geom: BaseGeometry) -> Tuple[List[int], Coords]:
+    """
+    Split a geometry into the sizes of its parts and a flat list of its coordinates.
+
+    Polygons list the size of each ring; multi part geometries list the size of each
+    part, with MultiPolygons giving the number of rings of each polygon first.
+    """
+    kind = geom.geom_type
+    if kind == "Point" or kind == "LineString":
+        return [], list(geom.coords)
+    if kind == "MultiPoint":
+        return [], [p.coords[0] for p in geom.geoms]
+    if kind == "Polygon":
+        rings = _rings(geom)
+        return [len(r) for r in rings], list(itertools.chain.from_iterable(rings))
+    if kind == "MultiLineString":
+        lines = [list(line.coords) for line in geom.geoms]
+        return [len(line) for line in lines], list(itertools.chain.from_iterable(lines))
+
+    parts, coords = [], []
+    for polygon in geom.geoms:
+        rings = _rings(polygon)
+        parts.append(len(rings))
+        for ring in rings:
+            parts.append(len(ring))
+            coords.extend(ring)
+    return parts, coords
+
+
+def _split(coords: Coords, sizes: Sequence[int]) -> List[Coords]:
+    start, pieces = 0, []
+    for size in sizes:
+        pieces.append(coords[start:start + size])
+        start += size
+    return pieces
+
+
+class Quantizer:
+    """
+    Encodes geometries as integer coordinates on a grid with cells of size
+    `precision`, anchored at (xoffset, yoffset). Every decoded coordinate is
+    within `precision / 2` of the original on each axis.
+    """
+
+    __slots__ = ("precision", "xoffset", "yoffset")
+
+    def __init__(
+        self, precision: float, xoffset: float = 0.0, yoffset: float = 0.0
+    ) -> None:
+        if precision <= 0:
+            raise ValueError("precision must be positive")
+        self.precision = precision
+        self.xoffset = xoffset
+        self.yoffset = yoffset
+
+    def encode(self, geom: BaseGeometry) -> Any:
+        """
+        Encode a geometry, keeping its exact bounds alongside it.
+
+        Geometry collections, empty and 3D geometries can't be encoded and
+        are returned unchanged.
+        """
+        if (
+            geom.geom_type not in _builders
+            or geom.is_empty
+            or geom.has_z
+        ):
+            return geom
+
+        parts, coords = _flatten(geom)
+        if geom.geom_type == "Polygon" and len(parts) == 1:
+            parts = []
+
+        bounds = geom.bounds
+        precision, xoffset, yoffset = self.precision, self.xoffset, self.yoffset
+        # the first coordinate is stored relative to the corner of the bounds,
+        # so that it's no larger than the deltas which follow it.
+        px, py = self.anchor(bounds)
+        deltas = []
+        for x, y in coords:
+            x = round((x - xoffset) / precision)
+            y = round((y - yoffset) / precision)
+            deltas.append(x - px)
+            deltas.append(y - py)
+            px, py = x, y
+
+        return QuantizedGeometry(
+            self,
+            geom.geom_type,
+            array(_typecode(parts), parts) if parts else None,
+            array(_typecode(deltas), deltas),
+            bounds,
+        )
+
+    def anchor(self, bounds: Sequence[float]) -> Tuple[int, int]:
+        """The grid position of the lower left corner of `bounds`."""
+        return (
+            round((bounds[0] - self.xoffset) / self.precision),
+            round((bounds[1] - self.yoffset) / self.precision),
+        )
+
+
+class QuantizedGeometry:
+    """
+    A compact, immutable encoding of a geometry: the differences between
+    successive coordinates on its Quantizer's grid, starting from the corner
+    of its bounds, packed in the smallest integer array which fits.
+
+    The exact bounds of the original geometry are kept, so it can be indexed
+    and compared by bounding box without being decoded.
+    """
+
+    __slots__ = ("quantizer", "geom_type", "parts", "deltas", "_bounds")
+
+    def __init__(
+        self,
+        quantizer: Quantizer,
+        geom_type: str,
+        parts: Any,
+        deltas: Any,
+        bounds: Tuple[float, ...],
+    ) -> None:
+        self.quantizer = quantizer
+        self.geom_type = geom_type
+        self.parts = parts
+        self.deltas = deltas
+        self._bounds = array("d", bounds)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """The exact bounds of the original geometry."""
+        xmin, ymin, xmax, ymax = self._bounds
+        return xmin, ymin, xmax, ymax
+
+    def coords(self) -> Coords:
+        """All of the decoded coordinates, in order."""
+        q = self.quantizer
+        x0, y0 = q.anchor(self._bounds)
+        xs = itertools.accumulate(itertools.chain((x0,), self.deltas[0::2]))
+        ys = itertools.accumulate(itertools.chain((y0,), self.deltas[1::2]))
+        next(xs), next(ys)  # skip the anchor itself
+        precision, xoffset, yoffset = q.precision, q.xoffset, q.yoffset
+        return [
+            (xoffset + x * precision, yoffset + y * precision) for x, y in zip(xs, ys)
+        ]
+
+    def decode(self) -> BaseGeometry:
+        """Build a shapely geometry from the encoded coordinates."""
+        return _builders[self.geom_type](self.coords(), self.parts)
+
+    @property
+    def __geo_interface__(self) -> Dict[str, Any]:
+        return self.decode().__geo_interface__
+
+
+def _build_multipolygon(coords: Coords, parts: Sequence[int]) -> MultiPolygon:
+    polygons = []
+    i = start = 0
+    while i < len(parts):
+        sizes = parts[i + 1:i + 1 + parts[i]]
+        rings = _split(coords[start:], sizes)
+        polygons.append((rings[0], rings[1:]))
+        start += sum(sizes)
+        i += 1 + parts[i]
+    return MultiPolygon(polygons)
+
+
+def _build_polygon(coords: Coords, parts: Sequence[int]) -> Polygon:
+    if parts is None:
+        return Polygon(coords)
+    rings = _split(coords, parts)
+    return Polygon(rings[0], rings[1:])
+
+
+_builders = {
+    "Point": lambda coords, parts: Point(coords[0]),
+    "LineString": lambda coords, parts: LineString(coords),
+    "MultiPoint": lambda coords, parts: MultiPoint(coords),
+    "Polygon": _build_polygon,
+    "MultiLineString": lambda coords, parts: MultiLineString(_split(coords, parts)),
+    "MultiPolygon": _build_multipolygon,
+}
@@ -0,0 +1,190 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+import pathlib
+import re
+
+from typing import Any, Dict, IO, Iterator
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+#: File suffixes read natively as a GeoJSON FeatureCollection.
+geojson_suffixes = (".geojson", ".json")
+
+#: File suffixes read natively as newline-delimited GeoJSON (GeoJSONSeq).
+geojsonseq_suffixes = (".geojsonl", ".geojsons", ".geojsonseq", ".ndjson", ".jsonl")
+
+
+class NotFeatures(ValueError):
+    """Raised for a JSON document which isn't a GeoJSON FeatureCollection or Feature."""
+
+
+_feature_types = ("FeatureCollection", "Feature")
+
+
+class _Stream:
+    """
+    Incrementally decode JSON values from a text file, reading it in chunks
+    so that only a small part of the file is ever held in memory.
+    """
+
+    def __init__(self, fp: IO[str], chunk_size: int) -> None:
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """
+        Read more of the file, dropping whatever has already been consumed.
+        Reads at least as much as is buffered, so a value much larger
+        than the chunk size is still decoded in linear time.
+        """
+        if self._eof:
+            return False
+        chunk = self._fp.read(max(self._chunk_size, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, or "" at the end of the file."""
+        while True:
+            match = _whitespace.match(self._buf, self._pos)
+            if match is not None:  # always, as the pattern matches ""
+                self._pos = match.end()
+            if self._pos < len(self._buf) or not self._fill():
+                break
+        return self._buf[self._pos:self._pos + 1]
+
+    def expect(self, *chars: str) -> str:
+        """Consume the next non-whitespace character, which must be one of `chars`."""
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError(f"Expected one of {' '.join(chars)} but got {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next JSON value."""
+        while True:
+            self.peek()
+            try:
+                obj, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number right at the end of the buffer may continue in the next chunk.
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return obj
+
+
+def iter_feature_collection(fp: IO[str], chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    Stream the features of a GeoJSON FeatureCollection one at a time, without
+    loading the whole document. A file holding a single Feature yields just that.
+
+    Any other document, like a bare geometry or TopoJSON, raises NotFeatures.
+
+    Args:
+        fp: a text file object
+        chunk_size: number of characters to read at a time
+
+    Returns:
+        iterator of GeoJSON-like Feature dicts
+    """
+    stream = _Stream(fp, chunk_size)
+    members: Dict[str, Any] = {}
+
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key == "features":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.expect("]")
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.expect(",", "]") == "]":
+                        break
+            members[key] = None
+        else:
+            members[key] = stream.value()
+            if key == "type" and members[key] not in _feature_types:
+                raise NotFeatures(f"Not a FeatureCollection or Feature: {members[key]!r}")
+
+        if stream.expect(",", "}") == "}":
+            break
+
+    if members.get("type") == "Feature":
+        yield members
+    elif "features" not in members:
+        raise NotFeatures("Not a FeatureCollection or Feature")
+
+
+def iter_geojsonseq(fp: IO[str]) -> Iterator[Dict]:
+    """
+    Stream the features of a newline-delimited GeoJSON file, with or without
+    the record separators of RFC 8142.
+
+    Args:
+        fp: a text file object
+
+    Returns:
+        iterator of GeoJSON-like Feature dicts
+    """
+    for line in fp:
+        line = line.strip("\x1e \t\r\n")
+        if line:
+            yield json.loads(line)
+
+
+def is_native(path: Any) -> bool:
+    """Whether the file at `path` can be read without fiona."""
+    suffix = pathlib.Path(path).suffix.lower()
+    return suffix in geojson_suffixes or suffix in geojsonseq_suffixes
+
+
+def iter_features(path: Any) -> Iterator[Dict]:
+    """
+    Stream the features of a GeoJSON or GeoJSONSeq file, chosen by its suffix.
+
+    Args:
+        path: path to the file
+
+    Returns:
+        iterator of GeoJSON-like Feature dicts
+    """
+    path = pathlib.Path(path)
+    with open(path, encoding="utf-8") as fp:
+        if path.suffix.lower() in geojsonseq_suffixes:
+            yield from iter_geojsonseq(fp)
+        else:
+            yield from iter_feature_collection(fp)
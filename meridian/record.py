@@ -21,17 +21,37 @@ import collections
 import operator
 import pathlib
 
-from typing import Tuple, Dict, Any
-
-import fiona
+from typing import Tuple, Dict, Any, TypeVar
 
 from shapely.geometry import shape
 from shapely.geometry.base import BaseGeometry
 
+from meridian import readers
+from meridian.indexes import index_types
+from meridian.quantized import QuantizedGeometry
+
+_R = TypeVar("_R", bound="Record")
+
 
 class Record(Tuple[Any]):
+    """
+    The base class for user-defined data models.
+
+    Attribute indexes can be declared for any annotated field with the
+    `indexes` class keyword, mapping the field name to "hash" (for
+    equality lookups) or "sorted" (for equality and range lookups).
+    Every Dataset of the Record type will then build those indexes,
+    which `Dataset.where` uses to find matching Records.
+
+        class PowerPlant(Record, indexes={"primsource": "hash", "mw": "sorted"}):
+            primsource: str
+            mw: float
+    """
+
     __slots__ = ()
 
+    _indexes = {}  # type: Dict[str, str]
+
     def __new__(cls, geom: BaseGeometry, *args: Any, **kwargs: Any):
         """
         Create a new Record. keyword arguments should be supplied which match the user-defined
@@ -50,7 +70,7 @@ class Record(Tuple[Any]):
             return tuple.__new__(cls, (*props, geom))
         return tuple.__new__(cls, (geom,))
 
-    def __init_subclass__(cls, **kwargs: Any) -> None:
+    def __init_subclass__(cls, indexes: Dict[str, str] = None, **kwargs: Any) -> None:
         if not getattr(cls, "__annotations__", None):
             cls.__annotations__ = collections.OrderedDict()
         else:
@@ -61,6 +81,14 @@ class Record(Tuple[Any]):
         for idx, anno in enumerate(cls.__annotations__):
             setattr(cls, anno, property(operator.itemgetter(idx)))
 
+        if indexes is not None:
+            for field, kind in indexes.items():
+                if field not in cls.__annotations__:
+                    raise ValueError(f"Cannot index {field}, it is not a field")
+                if kind not in index_types:
+                    raise ValueError(f"Index type must be one of {','.join(index_types)}")
+            cls._indexes = dict(indexes)
+
     def __repr__(self):
         return f"{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
 
@@ -70,6 +98,12 @@ class Record(Tuple[Any]):
         Create a Dataset of the implemented model from a source, either
         a fiona-readable data file or iterable of geojson.
 
+        GeoJSON (.geojson, .json) FeatureCollections and Features, and
+        newline-delimited GeoJSON (.geojsonl, .geojsons, .geojsonseq,
+        .ndjson, .jsonl) files are streamed by a built-in reader. Anything
+        else, or any file opened with extra kwargs, is read with fiona,
+        which is only imported when needed.
+
         Args:
             src: a path to a fiona-readable file or an
                  iterable of geojson-like dictionaries
@@ -84,6 +118,19 @@ class Record(Tuple[Any]):
         if isinstance(src, list) or hasattr(src, "__next__"):
             return Dataset((cls.from_geojson(gj) for gj in src))
         elif isinstance(src, (str, pathlib.Path)) and pathlib.Path(src).exists():
+            if not kwargs and readers.is_native(src):
+                try:
+                    return Dataset(
+                        cls.from_geojson(feature)
+                        for feature in readers.iter_features(src)
+                        if feature["geometry"]
+                    )
+                except readers.NotFeatures:
+                    # e.g. TopoJSON or a bare geometry, which fiona can read.
+                    pass
+
+            import fiona
+
             with fiona.open(src, **kwargs) as collection:
 
                 return Dataset(
@@ -107,12 +154,20 @@ class Record(Tuple[Any]):
         Returns:
             A new instance of the Record subclass.
         """
-        return cls.__new__(cls, shape(geojson["geometry"]), **geojson["properties"])
+        return cls.__new__(
+            cls, shape(geojson["geometry"]), **(geojson.get("properties") or {})
+        )
 
     @property
     def geom(self) -> BaseGeometry:
-        """The geometry of the Record."""
-        return self[-1]
+        """
+        The geometry of the Record. Records in a quantized Dataset decode
+        a new shapely geometry each time this is accessed.
+        """
+        geom = self[-1]
+        if isinstance(geom, QuantizedGeometry):
+            return geom.decode()
+        return geom
 
     @property
     def _geom(self) -> Any:
@@ -122,9 +177,26 @@ class Record(Tuple[Any]):
         property to access the underlying C geometry's pointer, so exposing
         it this way makes shapely think it's simply acting on another
         geometry object.
+
+        Records in a quantized Dataset don't hold a shapely geometry whose
+        pointer could outlive the call, so they must be passed to shapely
+        as `record.geom` instead.
         """
+        if isinstance(self[-1], QuantizedGeometry):
+            raise TypeError(
+                "Records in a quantized Dataset are not shapely geometries, "
+                "use record.geom instead"
+            )
         return self.geom._geom
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # tuple's default pickling would pass all the values to __new__ as the geom.
+        return tuple.__new__, (type(self), tuple(self))
+
+    def _with_geom(self: _R, geom: Any) -> _R:
+        """A copy of the Record with its geometry replaced by `geom`."""
+        return tuple.__new__(type(self), (*self[:-1], geom))
+
     @property
     def __geo_interface__(self) -> Dict[str, Any]:
         """
@@ -133,9 +205,7 @@ class Record(Tuple[Any]):
         return {
             "type": "Feature",
             "geometry": self.geom.__geo_interface__,
-            "properties": collections.OrderedDict(
-                {anno: self[idx] for idx, anno in enumerate(self.__annotations__)}
-            ),
+            "properties": collections.OrderedDict(zip(self.__annotations__, self)),
         }
 
     @property
@@ -147,7 +217,7 @@ class Record(Tuple[Any]):
         Returns:
             4-tuple of float
         """
-        return self.geom.bounds
+        return self[-1].bounds
 
     @property
     def geojson(self) -> Dict[str, Any]:
@@ -0,0 +1,366 @@
+# Copyright (c) 2019 Tom Caruso & individual contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import abc
+import csv
+import json
+import pathlib
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+
+import shapely
+from shapely import wkb
+from shapely.geometry import mapping
+from shapely.geometry.base import BaseGeometry
+
+Row = Tuple[Mapping[str, Any], Optional[BaseGeometry]]
+
+
+class Writer(abc.ABC):
+    """
+    Base class for batched, streaming writers.
+
+    Rows are buffered in memory until `batch_size` of them have accumulated,
+    then handed to the concrete writer to be written out in one go, so the
+    amount of memory used is bounded no matter how many rows are written.
+
+    `types` optionally maps column names to their Python types, e.g. a
+    Record's annotations, for writers whose columns are typed.
+    """
+
+    def __init__(
+        self, path: Any, batch_size: int = 1000, types: Mapping[str, Any] = None
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+
+        self.path = pathlib.Path(path)
+        self.batch_size = batch_size
+        self.types = dict(types or {})
+        self._buffer: List[Row] = []
+        self._count = 0
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def count(self) -> int:
+        """Number of rows written so far, including those still buffered."""
+        return self._count
+
+    def write(self, properties: Mapping[str, Any], geom: Optional[BaseGeometry]) -> None:
+        """
+        Add a row to the output.
+
+        Args:
+            properties: mapping of column name to value
+            geom: the row's geometry, or None
+        """
+        self._buffer.append((properties, geom))
+        self._count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write out any buffered rows."""
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        """Flush the buffer and close the underlying file."""
+        self.flush()
+        self._close()
+
+    @abc.abstractmethod
+    def _write_batch(self, rows: List[Row]) -> None:
+        """Write out a batch of rows."""
+
+    @abc.abstractmethod
+    def _close(self) -> None:
+        """Close the underlying file."""
+
+
+class CSVWriter(Writer):
+    """
+    Write rows as CSV, with the geometry as WKT in a trailing `geom` column.
+    The header is taken from the properties of the first row.
+    """
+
+    def __init__(
+        self, path: Any, batch_size: int = 1000, types: Mapping[str, Any] = None
+    ) -> None:
+        super().__init__(path, batch_size, types)
+        self._file = open(self.path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._header_written = False
+
+    def _write_batch(self, rows: List[Row]) -> None:
+        if not self._header_written:
+            self._writer.writerow([*rows[0][0].keys(), "geom"])
+            self._header_written = True
+
+        self._writer.writerows(
+            [*props.values(), geom.wkt if geom is not None else ""]
+            for props, geom in rows
+        )
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class GeoJSONSeqWriter(Writer):
+    """Write rows as newline-delimited GeoJSON Features."""
+
+    def __init__(
+        self, path: Any, batch_size: int = 1000, types: Mapping[str, Any] = None
+    ) -> None:
+        super().__init__(path, batch_size, types)
+        self._file = open(self.path, "w")
+
+    def _write_batch(self, rows: List[Row]) -> None:
+        self._file.write("".join(feature + "\n" for feature in features_json(rows)))
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class GeoJSONWriter(Writer):
+    """Write rows as a GeoJSON FeatureCollection, one Feature per line."""
+
+    def __init__(
+        self, path: Any, batch_size: int = 1000, types: Mapping[str, Any] = None
+    ) -> None:
+        super().__init__(path, batch_size, types)
+        self._file = open(self.path, "w")
+        self._file.write('{"type":"FeatureCollection","features":[\n')
+        self._first = True
+
+    def _write_batch(self, rows: List[Row]) -> None:
+        if not self._first:
+            self._file.write(",\n")
+        self._file.write(",\n".join(features_json(rows)))
+        self._first = False
+
+    def _close(self) -> None:
+        self._file.write("\n]}\n")
+        self._file.close()
+
+
+_arrow_types = {int: "int64", float: "float64", str: "string", bool: "bool_"}
+
+
+class ParquetWriter(Writer):
+    """
+    Write rows to a Parquet file, one row group per batch, with the geometry
+    as WKB in a `geometry` column. Requires `pyarrow`.
+
+    Columns with an int, float, str or bool type in `types` get the matching
+    Arrow type. Any others take the type inferred from the first batch, or
+    are written as strings if they're entirely None in it. Later batches are
+    cast to that schema, raising an error rather than losing data if they
+    don't fit, e.g. a float in an int column.
+    """
+
+    def __init__(
+        self, path: Any, batch_size: int = 1000, types: Mapping[str, Any] = None
+    ) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required to write parquet files")
+
+        super().__init__(path, batch_size, types)
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._writer: Any = None
+        self._string_columns: List[str] = []
+
+    def _schema(self, inferred: Any) -> Any:
+        pa = self._pa
+        fields = []
+        for field in inferred:
+            typ = self.types.get(field.name)
+            if field.name == "geometry":
+                field = field.with_type(pa.binary())
+            elif typ in _arrow_types:
+                field = field.with_type(getattr(pa, _arrow_types[typ])())
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+                self._string_columns.append(field.name)
+            fields.append(field)
+        return pa.schema(fields)
+
+    def _write_batch(self, rows: List[Row]) -> None:
+        columns: Dict[str, List[Any]] = {name: [] for name in rows[0][0]}
+        geoms = []
+        for props, geom in rows:
+            for name, value in props.items():
+                columns[name].append(value)
+            geoms.append(geom)
+        columns["geometry"] = wkb_array(geoms)
+
+        for name in self._string_columns:
+            columns[name] = [str(v) if v is not None else None for v in columns[name]]
+        table = self._pa.Table.from_pydict(columns)
+
+        if self._writer is None:
+            schema = self._schema(table.schema)
+            self._writer = self._pq.ParquetWriter(str(self.path), schema)
+
+        # a safe cast raises instead of truncating values which don't fit the schema.
+        self._writer.write_table(table.cast(self._writer.schema, safe=True))
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class FionaWriter(Writer):
+    """
+    Write rows with any OGR driver supported by fiona, e.g. "ESRI Shapefile"
+    or "GPKG". A fiona `schema` describing the rows is required.
+    """
+
+    def __init__(
+        self, path: Any, driver: str, schema: Dict[str, Any], batch_size: int = 1000
+    ) -> None:
+        import fiona
+
+        super().__init__(path, batch_size)
+        self._collection = fiona.open(str(self.path), "w", driver=driver, schema=schema)
+
+    def _write_batch(self, rows: List[Row]) -> None:
+        self._collection.writerecords(
+            {"geometry": mapping(geom) if geom is not None else None, "properties": props}
+            for props, geom in rows
+        )
+
+    def _close(self) -> None:
+        self._collection.close()
+
+
+_writers: Dict[str, Type[Writer]] = {
+    "csv": CSVWriter,
+    "geojson": GeoJSONWriter,
+    "geojsonseq": GeoJSONSeqWriter,
+    "parquet": ParquetWriter,
+}
+
+#: Formats which are written without fiona.
+native_formats = frozenset(_writers)
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+
+def feature_json(properties: Mapping[str, Any], geom: Optional[BaseGeometry]) -> str:
+    """Serialize a single GeoJSON Feature to a compact JSON string."""
+    return _encoder.encode(
+        {
+            "type": "Feature",
+            "geometry": mapping(geom) if geom is not None else None,
+            "properties": properties,
+        }
+    )
+
+
+# Shapely 2 can serialize a whole array of geometries in a single call.
+_vectorized = hasattr(shapely, "to_wkb")
+
+
+def features_json(rows: Sequence[Row]) -> List[str]:
+    """
+    Serialize rows to compact GeoJSON Feature strings. With Shapely 2 all of
+    the geometries are encoded in one call.
+    """
+    if not _vectorized:
+        return [feature_json(props, geom) for props, geom in rows]
+
+    geometries = shapely.to_geojson([geom for _, geom in rows]).tolist()
+    return [
+        '{"type":"Feature","geometry":%s,"properties":%s}'
+        % (geometry or "null", _encoder.encode(props))
+        for (props, _), geometry in zip(rows, geometries)
+    ]
+
+
+def wkb_array(geoms: Sequence[Optional[BaseGeometry]]) -> List[Optional[bytes]]:
+    """
+    Serialize geometries to WKB, leaving None for missing geometries. With
+    Shapely 2 they're all encoded in one call.
+    """
+    if _vectorized:
+        return shapely.to_wkb(geoms).tolist()
+    return [wkb.dumps(geom) if geom is not None else None for geom in geoms]
+
+
+_fiona_types = {int: "int", float: "float", str: "str", bool: "bool"}
+
+
+def fiona_schema(
+    annotations: Mapping[str, Any], geometry_types: Iterable[str]
+) -> Dict[str, Any]:
+    """
+    Build a fiona schema from a Record's annotations and the geometry types
+    to be written. Fields whose annotated type has no fiona equivalent are
+    written as strings. If there's more than one geometry type, e.g. a mix of
+    Polygons and MultiPolygons, the schema's geometry type is "Unknown".
+    """
+    types = set(geometry_types)
+    return {
+        "geometry": types.pop() if len(types) == 1 else "Unknown",
+        "properties": OrderedDict(
+            (name, _fiona_types.get(typ, "str")) for name, typ in annotations.items()
+        ),
+    }
+
+
+def open_writer(
+    path: Any,
+    format: str,
+    batch_size: int = 1000,
+    schema: Dict[str, Any] = None,
+    types: Mapping[str, Any] = None,
+) -> Writer:
+    """
+    Open a batched writer for the given output format.
+
+    Args:
+        path: the output file path
+        format: one of "csv", "geojson", "geojsonseq" or "parquet", or, if
+            a schema is given, the name of any fiona driver
+        batch_size: number of rows to buffer before writing
+        schema: a fiona schema, only needed for fiona drivers
+        types: the Python type of each column, e.g. a Record's annotations,
+            used by formats with typed columns
+
+    Returns:
+        a Writer, which should be closed (or used as a context manager)
+    """
+    if format in _writers:
+        return _writers[format](path, batch_size=batch_size, types=types)
+    if schema is not None:
+        return FionaWriter(path, format, schema, batch_size=batch_size)
+    raise ValueError(f"Format must be one of {','.join(_writers)}")
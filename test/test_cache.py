@@ -0,0 +1,82 @@
+import pytest
+
+from meridian import Dataset, QueryCache
+from test.conftest import make_point
+
+
+def test_cached_queries(dataset):
+    dataset.cache = QueryCache(maxsize=10)
+    pt = make_point(0.5, 0.5, as_geom=True)
+
+    first = dataset.intersection(pt)
+    assert dataset.intersection(pt) is first
+    assert dataset.count(pt) == 1
+    assert dataset.count(pt) == 1
+
+    info = dataset.cache.info()
+    assert info.hits == 2
+    assert info.misses == 2
+    assert info.currsize == 2
+
+
+def test_lru_eviction(dataset):
+    dataset.cache = QueryCache(maxsize=2)
+
+    for x in (0.5, 1.5, 0.5, 2.5):
+        dataset.count(make_point(x, 0.5, as_geom=True))
+
+    # 1.5 was the least recently used when 2.5 was added.
+    dataset.count(make_point(1.5, 0.5, as_geom=True))
+    assert dataset.cache.info().hits == 1
+    assert len(dataset.cache) == 2
+
+
+def test_ttl(dataset, monkeypatch):
+    dataset.cache = QueryCache(ttl=10)
+    now = [0.0]
+    monkeypatch.setattr("meridian.cache.time.monotonic", lambda: now[0])
+
+    pt = make_point(0.5, 0.5, as_geom=True)
+    dataset.count(pt)
+    now[0] = 5
+    dataset.count(pt)
+    now[0] = 20
+    dataset.count(pt)
+
+    assert dataset.cache.info().hits == 1
+    assert dataset.cache.info().misses == 2
+
+
+def test_tolerance(dataset):
+    dataset.cache = QueryCache(tolerance=0.01)
+
+    dataset.query_dwithin(make_point(0.5, 0.5, as_geom=True), 0.1)
+    dataset.query_dwithin(make_point(0.501, 0.501, as_geom=True), 0.1)
+    dataset.query_dwithin(make_point(0.6, 0.5, as_geom=True), 0.1)
+
+    assert dataset.cache.info().hits == 1
+
+
+def test_clear(dataset):
+    dataset.cache = QueryCache()
+    dataset.intersects(make_point(0.5, 0.5, as_geom=True))
+    dataset.cache.clear()
+
+    assert dataset.cache.info() == (0, 0, 1024, 0)
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        QueryCache(maxsize=0)
+    with pytest.raises(ValueError):
+        QueryCache(tolerance=0)
+
+
+def test_shared_cache(dataset):
+    other = Dataset(list(dataset)[:1])
+    dataset.cache = other.cache = QueryCache()
+
+    query = dataset[0].geom
+    assert len(dataset.intersection(query)) == 4
+    assert len(other.intersection(query)) == 1
+    assert dataset.cache.info().misses == 2
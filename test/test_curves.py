@@ -0,0 +1,30 @@
+from meridian.curves import curve_keys, hilbert_index, zorder_index
+
+
+def test_hilbert_index():
+    cells = sorted(
+        ((x, y) for x in range(4) for y in range(4)),
+        key=lambda c: hilbert_index(*c, order=2),
+    )
+
+    assert cells[0] == (0, 0)
+    assert cells[-1] == (3, 0)
+    # every step along the curve moves to a neighbouring cell.
+    for (x1, y1), (x2, y2) in zip(cells, cells[1:]):
+        assert abs(x1 - x2) + abs(y1 - y2) == 1
+
+
+def test_zorder_index():
+    assert [zorder_index(x, y) for x, y in [(0, 0), (1, 0), (0, 1), (1, 1), (2, 0)]] == [
+        0, 1, 2, 3, 4
+    ]
+
+
+def test_curve_keys():
+    bounds = [(0, 0, 1, 1), (10, 10, 11, 11), (0, 10, 1, 11), (5, 5, 5, 5)]
+    keys = curve_keys(bounds)
+
+    assert len(keys) == 4
+    assert keys[0] == min(keys)
+    assert curve_keys([]) == []
+    assert curve_keys([(1, 1, 1, 1)]) == [0]
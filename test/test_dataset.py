@@ -1,3 +1,9 @@
+import pickle
+
+import pytest
+
+from meridian import Dataset
+from test import conftest
 from test.conftest import make_point
 
 
@@ -42,3 +48,51 @@ def test_iter(dataset):
         i += 1
 
     assert i == len(dataset)
+
+
+def test_query_dwithin(dataset):
+    pt = make_point(3, 0.5, as_geom=True)
+
+    assert dataset.query_dwithin(pt, 0.9) == ()
+    assert {r.id for r in dataset.query_dwithin(pt, 1)} == {3}
+    assert {r.id for r in dataset.query_dwithin(pt, 1.2)} == {3, 4}
+
+
+def test_query_dwithin_points():
+    points = Dataset(
+        conftest.TestRecord(make_point(x, 0, as_geom=True), id=x) for x in range(1, 10)
+    )
+    pt = make_point(4, 3, as_geom=True)
+
+    # the bbox probe finds 1..7, but only 4 is within 3 units.
+    assert [r.id for r in points.query_dwithin(pt, 3)] == [4]
+    assert {r.id for r in points.query_dwithin(pt, 5)} == {1, 2, 3, 4, 5, 6, 7, 8}
+
+
+def test_query_dwithin_negative(dataset):
+    with pytest.raises(ValueError):
+        dataset.query_dwithin(make_point(0, 0, as_geom=True), -1)
+
+
+def test_order(dataset):
+    ordered = Dataset(dataset, order="hilbert")
+
+    # squares 1, 2, 4, 3 walk the 2x2 grid in Hilbert order.
+    assert [r.id for r in ordered] == [1, 2, 4, 3]
+    assert [r.id for r in ordered.intersection(make_point(0.5, 1.5, as_geom=True))] == [2]
+
+    zordered = Dataset(dataset, order="zorder")
+    assert [r.id for r in zordered] == [1, 3, 2, 4]
+
+
+def test_bad_order(dataset):
+    with pytest.raises(ValueError):
+        Dataset(dataset, order="peano")
+
+
+def test_pickle(dataset):
+    loaded = pickle.loads(pickle.dumps(dataset))
+
+    assert list(loaded) == list(dataset)
+    assert [r.id for r in loaded] == [1, 2, 3, 4]
+    assert loaded.count(dataset[0]) == 4
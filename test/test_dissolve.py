@@ -0,0 +1,66 @@
+import pytest
+
+from shapely.geometry import box
+
+from meridian import Dataset
+from meridian.dissolve import tree_union
+from test import conftest
+
+
+def test_tree_union():
+    groups = {"row": [box(x, 0, x + 1, 1) for x in range(10)], "single": [box(0, 5, 1, 6)]}
+    for workers in (None, 2):
+        unions = tree_union(groups, workers=workers, chunk_size=3)
+        assert unions["row"].equals(box(0, 0, 10, 1))
+        assert unions["single"].equals(box(0, 5, 1, 6))
+
+    with pytest.raises(ValueError):
+        tree_union(groups, workers=2, chunk_size=1)
+
+
+def make_grid():
+    # a 6x6 grid of unit squares, grouped into columns by field1.
+    return Dataset(
+        conftest.TestRecord(box(x, y, x + 1, y + 1), id=x * 6 + y + 1, field1=f"col{x}")
+        for x in range(6)
+        for y in range(6)
+    )
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_dissolve(workers):
+    dissolved = make_grid().dissolve("field1", workers=workers, chunk_size=4)
+
+    assert len(dissolved) == 6
+    assert [r.field1 for r in dissolved] == [f"col{x}" for x in range(6)]
+    for x, record in enumerate(dissolved):
+        assert isinstance(record, conftest.TestRecord)
+        assert record.id is None
+        assert record.field2 is None
+        assert record.geom.equals(box(x, 0, x + 1, 6))
+        assert record.bounds == (x, 0, x + 1, 6)
+
+
+def test_dissolve_quantized():
+    dataset = Dataset(make_grid(), precision=0.5)
+    dissolved = dataset.dissolve("field1")
+
+    assert dissolved.precision == 0.5
+    assert dissolved[0].geom.equals(box(0, 0, 1, 6))
+
+
+def test_dissolve_not_a_field(dataset):
+    with pytest.raises(ValueError):
+        dataset.dissolve("population")
+
+
+def test_dissolve_falsy_key():
+    # Record() would replace an id of 0 with the default, so build them directly.
+    dataset = Dataset(
+        tuple.__new__(conftest.TestRecord, (x % 2, None, None, box(x, 0, x + 1, 1)))
+        for x in range(4)
+    )
+    dissolved = dataset.dissolve("id")
+
+    assert [r.id for r in dissolved] == [0, 1]
+    assert dissolved[0].geom.area == 2
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from shapely import wkb
+from shapely.affinity import translate
+from shapely.geometry import MultiPolygon
+
+from meridian import Dataset
+from meridian.writers import feature_json, features_json, wkb_array
+from test import conftest
+
+
+def test_iter_geojson(dataset):
+    features = [json.loads(f) for f in dataset.iter_geojson()]
+
+    assert len(features) == 4
+    assert features[0] == json.loads(json.dumps(dataset[0].geojson))
+
+
+def test_to_wkb_array(dataset):
+    array = dataset.to_wkb_array()
+
+    assert len(array) == 4
+    assert all(wkb.loads(b).equals(r.geom) for b, r in zip(array, dataset))
+
+
+def test_bulk_serializers_match_per_row(dataset):
+    rows = [({"id": r.id, "name": None}, r.geom) for r in dataset]
+    rows.append(({"id": 5, "name": "none"}, None))
+
+    assert features_json(rows) == [feature_json(*row) for row in rows]
+    assert wkb_array([geom for _, geom in rows]) == [
+        wkb.dumps(geom) if geom is not None else None for _, geom in rows
+    ]
+
+
+def test_to_file_geojson(tmp_path, dataset):
+    path = tmp_path / "out.geojson"
+    assert dataset.to_file(path, batch_size=3) == 4
+
+    collection = json.loads(path.read_text())
+    assert collection["type"] == "FeatureCollection"
+    assert [f["properties"]["id"] for f in collection["features"]] == [1, 2, 3, 4]
+
+
+def test_to_file_geojsonseq(tmp_path, dataset):
+    path = tmp_path / "out.geojsonl"
+    dataset.to_file(path, driver="geojsonseq")
+
+    assert len(path.read_text().splitlines()) == 4
+
+
+def test_to_file_fiona(tmp_path, dataset):
+    pytest.importorskip("fiona")
+
+    path = tmp_path / "out.gpkg"
+    dataset.to_file(path, driver="GPKG")
+
+    loaded = conftest.TestRecord.load_from(path)
+    assert len(loaded) == 4
+    assert sorted(r.id for r in loaded) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("driver,suffix", [("GPKG", "gpkg"), ("ESRI Shapefile", "shp")])
+def test_to_file_fiona_mixed_types(tmp_path, driver, suffix):
+    pytest.importorskip("fiona")
+
+    square = conftest.make_square(as_geom=True)
+    dataset = Dataset(
+        [
+            conftest.TestRecord(square, id=1),
+            conftest.TestRecord(MultiPolygon([square, translate(square, 2)]), id=2),
+        ]
+    )
+    path = tmp_path / f"out.{suffix}"
+    assert dataset.to_file(path, driver=driver) == 2
+
+    loaded = conftest.TestRecord.load_from(path)
+    assert sorted(r.id for r in loaded) == [1, 2]
+    assert sum(r.geom.area for r in loaded) == 3
@@ -0,0 +1,135 @@
+import itertools
+
+import pytest
+
+from meridian import Dataset, Record
+from meridian.indexes import HashIndex, SortedIndex, parse_lookup
+from test.conftest import make_point, make_square
+
+
+class Plant(Record, indexes={"source": "hash", "mw": "sorted"}):
+    source: str
+    mw: float
+    name: str
+
+
+class UnindexedPlant(Record):
+    source: str
+    mw: float
+    name: str
+
+
+@pytest.fixture()
+def plants():
+    """A 10x10 grid of plants, with mw increasing from 1 along the grid."""
+    records = []
+    for x in range(10):
+        for y in range(10):
+            source = "solar" if (x + y) % 2 else "wind"
+            geom = make_point(x, y, as_geom=True)
+            records.append(Plant(geom, source=source, mw=x * 10 + y + 1, name=f"{x},{y}"))
+    return Dataset(records)
+
+
+def test_parse_lookup():
+    assert parse_lookup("mw") == ("mw", "eq")
+    assert parse_lookup("mw__gte") == ("mw", "gte")
+    assert parse_lookup("plant__name") == ("plant__name", "eq")
+
+
+def test_hash_index():
+    index = HashIndex(["a", "b", "a", None])
+
+    assert index.estimate("eq", "a") == 2
+    assert list(index.lookup("eq", "a")) == [0, 2]
+    assert sorted(index.lookup("in", ["b", None])) == [1, 3]
+
+
+def test_sorted_index():
+    index = SortedIndex([5, 1, None, 3, 3])
+
+    assert sorted(index.lookup("eq", 3)) == [3, 4]
+    assert sorted(index.lookup("gt", 3)) == [0]
+    assert sorted(index.lookup("gte", 3)) == [0, 3, 4]
+    assert sorted(index.lookup("lt", 3)) == [1]
+    assert index.estimate("lte", 3) == 3
+
+
+def test_where(plants):
+    assert len(plants.where(source="solar")) == 50
+    assert [p.mw for p in plants.where(mw__gt=97)] == [98, 99, 100]
+    assert [p.mw for p in plants.where(source="wind", mw__in=[1, 2, 3])] == [1, 3]
+    assert [p.name for p in plants.where(name="3,4")] == ["3,4"]
+    assert plants.where(name__ne="3,4", mw__lte=1)[0].name == "0,0"
+
+
+def test_where_spatial(plants):
+    window = make_square(2, 2, delta=2, as_geom=True)
+
+    assert len(plants.where(window)) == 9
+    assert len(plants.where(window, source="solar")) == 4
+    assert [p.name for p in plants.where(window, mw__gt=42)] == ["4,2", "4,3", "4,4"]
+
+
+def test_where_unindexed(dataset):
+    assert [r.id for r in dataset.where(id__gte=3)] == [3, 4]
+
+
+def test_bad_index():
+    with pytest.raises(ValueError):
+        class Bad(Record, indexes={"missing": "hash"}):
+            name: str
+
+    with pytest.raises(ValueError):
+        class Worse(Record, indexes={"name": "btree"}):
+            name: str
+
+
+def test_sorted_index_mixed_types():
+    index = SortedIndex([5, "N/A", None, 3, float("nan"), 4.5])
+
+    assert sorted(index.lookup("gt", 3)) == [0, 5]
+    assert sorted(index.lookup("eq", "N/A")) == [1]
+    assert sorted(index.lookup("eq", None)) == [2]
+    assert index.lookup("gt", "3") == [1]
+    assert index.lookup("gt", None) == []
+    assert index.lookup("gte", float("nan")) == []
+    assert index.estimate("lte", 4.5) == 2
+
+
+def test_hash_index_unhashable():
+    index = HashIndex(["a", ["b"], "a"])
+
+    assert sorted(index.lookup("in", ["a"])) == [0, 2]
+    with pytest.raises(TypeError):
+        index.lookup("in", [["b"]])
+
+
+@pytest.mark.parametrize(
+    "lookups",
+    [
+        {"mw__gt": None},
+        {"mw__gt": "3"},
+        {"mw__in": 3},
+        {"mw": None},
+        {"mw__lt": 3},
+        {"mw__gte": float("nan")},
+        {"source__in": [["x"]]},
+        {"source__in": "solar"},
+        {"source__in": ("solar",), "mw__gte": 95},
+    ],
+)
+def test_where_indexed_matches_unindexed(lookups):
+    values = [1, 2, None, "N/A", 3, float("nan"), 96, 97.5, 100]
+    records = [
+        Plant(make_point(i, i, as_geom=True), source=s, mw=mw, name=str(i))
+        for i, (s, mw) in enumerate(zip(itertools.cycle(["solar", "wind"]), values), 1)
+    ]
+    indexed = Dataset(records)
+    unindexed = Dataset(
+        UnindexedPlant(r.geom, source=r.source, mw=r.mw, name=r.name) for r in records
+    )
+
+    assert [r.name for r in indexed.where(**lookups)] == [
+        r.name for r in unindexed.where(**lookups)
+    ]
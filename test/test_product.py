@@ -0,0 +1,242 @@
+import csv
+import json
+
+import pytest
+
+from shapely import geometry
+
+from meridian import Dataset, Product, SelfJoin, knn_join, product, self_join
+from test import conftest
+
+
+def make_bowtie():
+    """An invalid, self-intersecting polygon which makes some predicates raise."""
+    return conftest.TestRecord(
+        geometry.Polygon([(0, 0), (2, 2), (2, 0), (0, 2), (0, 0)]), id=99
+    )
+
+
+@pytest.fixture()
+def invalid_dataset():
+    return Dataset([make_bowtie(), make_bowtie()])
+
+
+def test_product(dataset):
+    pairs = list(product(dataset, dataset))
+
+    # every square intersects itself and its neighbours, including corners.
+    assert len(pairs) == 16
+
+
+def test_product_iterable(dataset):
+    pairs = list(product(list(dataset)[:1], dataset))
+    assert len(pairs) == 4
+
+
+def test_max_errors(dataset, invalid_dataset):
+    prod = Product(dataset, invalid_dataset, predicate="overlaps", max_errors=3)
+    assert list(prod) == []
+
+    assert prod.error_count == 8
+    assert len(prod.errors) == 3
+
+
+def test_error_log(tmp_path, dataset, invalid_dataset):
+    log = tmp_path / "errors.jsonl"
+    prod = Product(dataset, invalid_dataset, predicate="overlaps", error_log=log)
+    list(prod)
+
+    errors = prod.errors
+    assert prod.error_count == len(errors) == 8
+    assert errors[0]["record"]["properties"]["id"] == 99
+    assert list(prod.iter_errors()) == errors
+    assert len(log.read_text().splitlines()) == 8
+
+
+def test_to_file_geojsonseq(tmp_path, dataset):
+    path = tmp_path / "out.geojsonl"
+    written = Product(dataset, dataset).to_file(path, batch_size=3)
+
+    lines = path.read_text().splitlines()
+    assert written == len(lines) == 16
+
+    feature = json.loads(lines[0])
+    assert feature["type"] == "Feature"
+    assert set(feature["properties"]) == {
+        "left_id", "left_field1", "left_field2", "right_id", "right_field1", "right_field2"
+    }
+
+
+def test_to_file_csv(tmp_path, dataset):
+    path = tmp_path / "out.csv"
+    Product(dataset, dataset).to_file(path, format="csv")
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    assert len(rows) == 16
+    assert rows[0]["geom"].startswith("POLYGON")
+
+
+def test_to_file_parquet(tmp_path, dataset):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    path = tmp_path / "out.parquet"
+    Product(dataset, dataset).to_file(path, format="parquet", batch_size=5)
+
+    table = pq.read_table(str(path))
+    assert table.num_rows == 16
+    assert "geometry" in table.column_names
+
+
+def test_parquet_null_first_batch(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from meridian.writers import ParquetWriter
+
+    path = tmp_path / "out.parquet"
+    with ParquetWriter(path, batch_size=2) as writer:
+        for value in (None, None, 3, "x"):
+            writer.write({"value": value}, conftest.make_point(0, 0, as_geom=True))
+
+    table = pq.read_table(str(path))
+    assert table.column("value").to_pylist() == [None, None, "3", "x"]
+
+
+def test_parquet_types(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    from meridian.writers import ParquetWriter
+
+    point = conftest.make_point(0, 0, as_geom=True)
+    path = tmp_path / "typed.parquet"
+    with ParquetWriter(path, batch_size=2, types={"mw": float}) as writer:
+        for mw in (1, 2, 5.5):
+            writer.write({"mw": mw}, point)
+    assert pq.read_table(str(path)).column("mw").to_pylist() == [1.0, 2.0, 5.5]
+
+    # without a declared type, a value which doesn't fit fails instead of truncating.
+    with pytest.raises(pa.ArrowInvalid, match="truncated"):
+        with ParquetWriter(tmp_path / "untyped.parquet", batch_size=2) as writer:
+            for mw in (1, 2, 5.5):
+                writer.write({"mw": mw}, point)
+
+
+def test_to_file_bad_format(tmp_path, dataset):
+    with pytest.raises(ValueError):
+        Product(dataset, dataset).to_file(tmp_path / "out", format="xlsx")
+
+
+def test_dwithin(dataset):
+    far = Dataset([conftest.TestRecord(conftest.make_square(3, 0, as_geom=True), id=5)])
+
+    assert list(product(far, dataset, predicate="intersects")) == []
+    assert {r2.id for _, r2 in product(far, dataset, "dwithin", distance=1)} == {3, 4}
+
+
+def test_dwithin_requires_distance(dataset):
+    with pytest.raises(ValueError):
+        Product(dataset, dataset, predicate="dwithin")
+    with pytest.raises(ValueError):
+        Product(dataset, dataset, predicate="dwithin", distance=-1)
+    with pytest.raises(ValueError):
+        Product(dataset, dataset, predicate="intersects", distance=5)
+
+
+def test_self_join(dataset):
+    pairs = list(self_join(dataset))
+
+    # each square touches the other three once, and never itself.
+    assert len(pairs) == 6
+    assert all(r1.id < r2.id for r1, r2 in pairs)
+
+
+def test_len(dataset):
+    prod = Product(dataset, dataset)
+    with pytest.raises(TypeError):
+        len(prod)
+
+    list(prod)
+    joined = SelfJoin(dataset)
+    list(joined)
+    assert len(prod) == len(joined) == len(dataset)
+
+
+def test_self_join_dwithin():
+    points = Dataset(
+        conftest.TestRecord(conftest.make_point(x, 0, as_geom=True), id=i)
+        for i, x in enumerate((0, 1, 2, 10, 10.5, 20), 1)
+    )
+    pairs = {(r1.id, r2.id) for r1, r2 in self_join(points, "dwithin", distance=1)}
+
+    assert pairs == {(1, 2), (2, 3), (4, 5)}
+
+
+def test_self_join_clusters():
+    squares = Dataset(
+        conftest.TestRecord(conftest.make_square(x, 0, delta=1.5, as_geom=True), id=i)
+        for i, x in enumerate((0, 1, 2, 5, 6, 9), 1)
+    )
+    clusters = SelfJoin(squares).clusters()
+
+    assert [[r.id for r in c] for c in clusters] == [[1, 2, 3], [4, 5]]
+
+
+def test_self_join_asymmetric(dataset):
+    with pytest.raises(ValueError):
+        SelfJoin(dataset, predicate="contains")
+
+
+@pytest.fixture()
+def points():
+    return Dataset(
+        conftest.TestRecord(conftest.make_point(x, y, as_geom=True), id=x * 10 + y + 1)
+        for x in range(10)
+        for y in range(10)
+    )
+
+
+def test_knn_join(dataset, points):
+    results = list(knn_join(points, dataset, k=2))
+    assert len(results) == 200
+
+    # the nearest square to (9, 9) is 4, at (1, 1) to (2, 2), then 2 and 3.
+    neighbours = [(r2.id, d) for r1, r2, d in results if r1.id == 100]
+    assert neighbours[0] == (4, pytest.approx(2 ** 0.5 * 7))
+    assert neighbours[1][1] == pytest.approx((49 + 64) ** 0.5)
+
+
+def test_knn_join_exact(points):
+    """bbox distance would rank the long line first, but it's further away."""
+    line = conftest.TestRecord(geometry.LineString([(0, 0), (5, 0.9), (10, 0)]), id=1)
+    near = conftest.TestRecord(conftest.make_point(5, 0.5, as_geom=True), id=2)
+    target = Dataset([conftest.TestRecord(conftest.make_point(5, 0, as_geom=True), id=3)])
+
+    results = list(knn_join(target, Dataset([line, near]), k=1))
+    assert [(r2.id, d) for _, r2, d in results] == [(2, 0.5)]
+
+
+def test_knn_join_max_distance(dataset, points):
+    results = list(knn_join(points, dataset, k=3, max_distance=1))
+
+    assert all(d <= 1 for _, _, d in results)
+    # every point within 1 of the 2x2 grid of squares, so all but the corner (3, 3).
+    assert {r1.id for r1, _, _ in results} == {
+        x * 10 + y + 1 for x in range(4) for y in range(4) if (x, y) != (3, 3)
+    }
+
+
+@pytest.mark.parametrize("kwargs", [dict(k=0), dict(batch_size=0)])
+def test_knn_join_invalid(dataset, points, kwargs):
+    # rejected when called, before any results are requested
+    with pytest.raises(ValueError):
+        knn_join(points, dataset, **kwargs)
+
+
+def test_knn_join_workers(dataset, points):
+    serial = [(r1.id, r2.id, d) for r1, r2, d in knn_join(points, dataset, k=2)]
+    parallel = [
+        (r1.id, r2.id, d)
+        for r1, r2, d in knn_join(points, dataset, k=2, workers=2, batch_size=7)
+    ]
+
+    assert serial == parallel
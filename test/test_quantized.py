@@ -0,0 +1,75 @@
+import pytest
+
+from shapely import geometry, wkt
+
+from meridian import Dataset, Product
+from meridian.quantized import QuantizedGeometry, Quantizer
+from test import conftest
+
+GEOMETRIES = [
+    "POINT (1.234567 2.345678)",
+    "LINESTRING (0 0, 1.0001 1.0002, 2.5 -3.25)",
+    "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0), (2 2, 2 3, 3 3, 3 2, 2 2))",
+    "MULTIPOINT (0 0, 5.55555 5.55555)",
+    "MULTILINESTRING ((0 0, 1 1), (2 2, 3 3, 4 2))",
+    "MULTIPOLYGON (((0 0, 1 0, 1 1, 0 0)), "
+    "((5 5, 9 5, 9 9, 5 9, 5 5), (6 6, 6 7, 7 7, 6 6)))",
+]
+
+
+@pytest.mark.parametrize("text", GEOMETRIES)
+def test_roundtrip(text):
+    geom = wkt.loads(text)
+    encoded = Quantizer(0.001, -1, -5).encode(geom)
+
+    assert isinstance(encoded, QuantizedGeometry)
+    assert encoded.bounds == geom.bounds
+
+    decoded = encoded.decode()
+    assert decoded.geom_type == geom.geom_type
+    assert decoded.equals_exact(geom, 0.0005 * 2 ** 0.5)
+
+
+def test_delta_typecode():
+    line = geometry.LineString([(0, 0), (1, 1), (2, 2)])
+    assert Quantizer(0.001).encode(line).deltas.typecode == "h"
+    assert Quantizer(1).encode(line).deltas.typecode == "b"
+
+
+def test_unencodable_geometries_are_unchanged():
+    collection = wkt.loads("GEOMETRYCOLLECTION (POINT (0 0), POINT (1 1))")
+    line = wkt.loads("LINESTRING Z (0 0 0, 1 1 1)")
+    quantizer = Quantizer(0.1)
+
+    assert quantizer.encode(collection) is collection
+    assert quantizer.encode(line) is line
+
+
+def test_bad_precision():
+    with pytest.raises(ValueError):
+        Quantizer(0)
+
+
+def test_quantized_dataset():
+    records = [
+        conftest.TestRecord(conftest.make_square(i + 0.123456, i, as_geom=True), id=i + 1)
+        for i in range(10)
+    ]
+    dataset = Dataset(records, precision=0.01)
+
+    assert dataset.precision == 0.01
+    for original, record in zip(records, dataset):
+        assert isinstance(record[-1], QuantizedGeometry)
+        assert record.bounds == original.bounds
+        assert record.geom.equals_exact(original.geom, 0.005 * 2 ** 0.5)
+        assert record.id == original.id
+
+    query = conftest.make_square(3.5, 3.5, as_geom=True)
+    assert {r.id for r in dataset.intersection(query)} == {4, 5}
+    assert {r.id for r in dataset.query_dwithin(query, 0.1)} == {4, 5}
+    queries = Dataset([conftest.TestRecord(query, id=1)])
+    assert {r2.id for _, r2 in Product(queries, dataset)} == {4, 5}
+    assert dataset[0].geojson["geometry"]["type"] == "Polygon"
+
+    with pytest.raises(TypeError):
+        query.intersects(dataset[0])
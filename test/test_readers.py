@@ -0,0 +1,130 @@
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from meridian.readers import NotFeatures, iter_feature_collection, iter_geojsonseq
+from test import conftest
+from test.conftest import make_point
+
+
+def features(n):
+    return [
+        {"type": "Feature", "geometry": make_point(i, i * 1.25), "properties": {"id": i + 1}}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_feature_collection(chunk_size):
+    document = json.dumps(
+        {
+            "type": "FeatureCollection",
+            "name": "points",
+            "features": features(20),
+            "bbox": [0, 0, 19, 23.75],
+        },
+        indent=2,
+    )
+
+    result = list(iter_feature_collection(io.StringIO(document), chunk_size=chunk_size))
+    assert result == features(20)
+
+
+def test_empty_feature_collection():
+    document = '{"type": "FeatureCollection", "features": []}'
+    assert list(iter_feature_collection(io.StringIO(document))) == []
+
+
+def test_single_feature():
+    document = json.dumps(features(1)[0])
+    assert list(iter_feature_collection(io.StringIO(document))) == features(1)
+
+
+def test_malformed():
+    with pytest.raises(ValueError):
+        list(iter_feature_collection(io.StringIO('{"features": [{"type": "Feature"} {}]}')))
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        '{"type": "Point", "coordinates": [1, 2]}',
+        '{"type": "Topology", "objects": {}, "arcs": []}',
+        '{"coordinates": [1, 2], "type": "Point"}',
+        "{}",
+    ],
+)
+def test_not_features(document):
+    with pytest.raises(NotFeatures):
+        list(iter_feature_collection(io.StringIO(document)))
+
+
+def test_geojsonseq():
+    lines = "".join(f"\x1e{json.dumps(f)}\n" for f in features(3)) + "\n"
+    assert list(iter_geojsonseq(io.StringIO(lines))) == features(3)
+
+
+def test_load_from(tmp_path):
+    collection = tmp_path / "points.geojson"
+    collection.write_text(json.dumps({"type": "FeatureCollection", "features": features(5)}))
+    seq = tmp_path / "points.geojsonl"
+    seq.write_text("\n".join(json.dumps(f) for f in features(5)))
+
+    assert [r.id for r in conftest.TestRecord.load_from(collection)] == [1, 2, 3, 4, 5]
+    assert [r.id for r in conftest.TestRecord.load_from(seq)] == [1, 2, 3, 4, 5]
+
+
+def test_load_from_utf8(tmp_path):
+    collection = tmp_path / "points.geojson"
+    feature = {"type": "Feature", "geometry": make_point(0, 0), "properties": {"id": 1}}
+    feature["properties"]["field1"] = "Montréal"
+    text = json.dumps({"type": "FeatureCollection", "features": [feature]}, ensure_ascii=False)
+    collection.write_bytes(text.encode("utf-8"))
+
+    assert conftest.TestRecord.load_from(collection)[0].field1 == "Montréal"
+
+
+def test_load_from_empty(tmp_path):
+    collection = tmp_path / "empty.geojson"
+    collection.write_text('{"type": "FeatureCollection", "features": []}')
+
+    with pytest.raises(ValueError):
+        conftest.TestRecord.load_from(collection)
+
+
+def test_load_from_fiona_fallback(tmp_path):
+    pytest.importorskip("fiona")
+
+    geometry = tmp_path / "point.json"
+    geometry.write_text(json.dumps(make_point(1, 2)))
+    topology = tmp_path / "topology.json"
+    topology.write_text(
+        json.dumps(
+            {
+                "type": "Topology",
+                "objects": {
+                    "points": {
+                        "type": "GeometryCollection",
+                        "geometries": [
+                            {"type": "Point", "coordinates": [1, 2], "properties": {"id": 7}}
+                        ],
+                    }
+                },
+                "arcs": [],
+            }
+        )
+    )
+
+    assert conftest.TestRecord.load_from(geometry)[0].geom.equals(
+        make_point(1, 2, as_geom=True)
+    )
+    assert [r.id for r in conftest.TestRecord.load_from(topology)] == [7]
+
+
+def test_fiona_not_imported():
+    code = "import sys, meridian; print('fiona' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert output.stdout.strip() == "False"
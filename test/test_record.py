@@ -1,3 +1,5 @@
+import pickle
+
 from collections import OrderedDict
 
 import pytest
@@ -51,3 +53,11 @@ def test_geojson(record):
         "properties": OrderedDict([("id", 1), ("field1", None), ("field2", "default")]),
         "type": "Feature",
     }
+
+
+def test_pickle(record):
+    loaded = pickle.loads(pickle.dumps(record))
+
+    assert type(loaded) is type(record)
+    assert loaded.id == record.id
+    assert loaded.geom.equals(record.geom)